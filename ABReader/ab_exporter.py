@@ -1,63 +1,90 @@
 from ABReader.ab_input import ABInput
 from ABReader.texture2d_reader import Texture2DReader
 from ABReader.mesh_reader import MeshReader
+from ABReader.mesh import Mesh
 from ABReader.bin_reader import BinaryReader
-from ABReader.etc2_decomp import ETC2A8Decoder
+from ABReader.texture_decoders import decode_texture
 import os
 import numpy as np
 from PIL import Image
 
-# import texture2ddecoder  # ref file
-
 
 class ABExporter:
     def __init__(self, ab_input: ABInput) -> None:
+        self.ab_input = ab_input
         self.files = ab_input.data_files
         self.resources = ab_input.resource_files
 
-    def export(self, path: str = None, processes=1):
-        self.texture_nums = 0
+    def export(self, path: str = None, processes=1, as_array=False):
+        """
+        Export every Texture2D and Mesh object of the bundle.
+
+        Objects are exported in (path_id, name) order whatever the number of threads:
+        results come back in that order, and the i-th texture is written to `{i}.png`.
+        An exception raised while exporting an object is re-raised here.
+
+        Args:
+            path (str): Output directory. Default is None, returning the results instead.
+            processes (int): Number of exporting threads. Default is 1.
+            as_array (bool): Return textures as read-only (H, W, 4) RGBA arrays (see
+            `export_texture2d`) instead of PIL images. Default is False.
+
+        Returns:
+            list: Images (or arrays) and `Mesh` objects in object order, or None if `path`
+            is set (meshes are then written as OBJ).
+        """
         self.path = path
-        self.results = []
+        files = sorted(self.files, key=lambda f: (f.path_id, f.name))
+        jobs, self.texture_nums = [], 0
+        for file in files:
+            jobs.append((file, self.texture_nums))
+            if type(file) == Texture2DReader:
+                self.texture_nums += 1
         if processes > 1:
             from concurrent.futures import ThreadPoolExecutor as TPE
 
-            pool = TPE(processes)
-        for file in self.files:
-            if processes > 1:
-                pool.submit(self._export_single, file)
-            else:
-                self._export_single(file)
-        if processes > 1:
-            pool.shutdown(wait=True)
+            with TPE(processes) as pool:
+                futures = [
+                    pool.submit(self._export_single, *job, as_array) for job in jobs
+                ]
+            self.results = [future.result() for future in futures]
+        else:
+            self.results = [self._export_single(*job, as_array) for job in jobs]
         return None if path else self.results
 
-    def _export_single(self, file):
+    def _export_single(self, file, texture_idx: int, as_array=False):
         if type(file) == Texture2DReader:
-            img = self.export_texture2d(file)
-            (
-                img.save(os.path.join(self.path, f"{self.texture_nums}.png"))
-                if self.path
-                else self.results.append(img)
-            )
+            img = self.export_texture2d(file, as_array)
+            if self.path:
+                out = os.path.join(self.path, f"{texture_idx}.png")
+                (Image.fromarray(img, "RGBA") if as_array else img).save(out)
+            return img
         elif type(file) == MeshReader:
-            lines = self.export_mesh(file)
+            mesh = self.export_mesh(file)
             if self.path:
-                with open(os.path.join(self.path, "mesh.obj"), "w+") as f:
-                    f.writelines(lines)
-            else:
-                self.results.append(lines)
+                mesh.write_obj(os.path.join(self.path, "mesh.obj"))
+            return mesh
         else:
             raise NotImplementedError("Unknown file type")
 
-    def export_texture2d(self, file: Texture2DReader):
+    def export_texture2d(
+        self, file: Texture2DReader, as_array=False, chunk_rows: int = None
+    ):
+        """
+        Decode a Texture2D object, block-compressed formats `chunk_rows` block rows at a
+        time (see `decode_texture`).
+
+        With `as_array`, the result is a read-only (H, W, 4) uint8 RGBA array, top row first.
+        It is a flipped view of the decoded buffer: no copy is made past decoding.
+        """
         img_metadata = file.get_image_data()
         # read data with offset and size
-        # reader = BinaryReader(self.resources[])
         path = os.path.basename(file.stream_data["path"])
         print(path, "offset:", img_metadata["offset"])
-        reader = BinaryReader(self.resources[path]).moveTo(img_metadata["offset"])
-        buf = [int(h, 16) for h in reader.read(img_metadata["size"], strip=False)]
+        reader = BinaryReader(
+            self.ab_input.read_node(path, img_metadata["offset"], img_metadata["size"])
+        )
+        buf = reader.read_array(np.uint8, img_metadata["size"])
         print(
             "data buffer:",
             buf[:10],
@@ -67,46 +94,18 @@ class ABExporter:
             img_metadata["size"],
         )
         print(f"Image size: {file.width}x{file.height}")
-        # we deal with 2 known formats: ETC2_RGBA8 and RGBA32
-        # typically RGBA8 means 8 bits for each channel(RRGGBBAA)
-        # resulting in total 32 bits, which is what 32 meaning in RGBA32
-        # then we just need to decompress the ETC2 format
-        # and save it as PNG
-        if file.texture_fmt == "RGBA32":
-            assert file.width * file.height * 4 == len(buf)
-            img = np.frombuffer(bytes(buf), dtype=np.uint8).reshape(
-                (file.height, file.width, 4)
-            )
-            img = np.flip(img, axis=0)
-            img = Image.fromarray(img, "RGBA")
-        elif file.texture_fmt == "ETC2_RGBA8":
-            assert img_metadata["size"] % 16 == 0
-            # img_ = texture2ddecoder.decode_etc2a8(bytes(buf), file.width, file.height)
-            # img_ = np.frombuffer(img_, dtype=np.uint32)
-            img = ETC2A8Decoder(buf, file.width, file.height).decode()
-            # assert np.all(img_ == img)
-            # print(colorama.Fore.GREEN, "CHECK PASS")
-            img = np.frombuffer(img, dtype=np.uint8).reshape(
-                (file.height, file.width, 4)
-            )
-            img = np.flip(img, axis=0)
-            # we turn BGRA into RGBA (0, 1, 2, 3 -> 2, 1, 0, 3)
-            img = Image.fromarray(img[..., [2, 1, 0, 3]], "RGBA")
-        self.texture_nums += 1
+        # every format is decoded into RGBA8 (see texture_decoders.decode_texture)
+        # block-compressed formats (ETC, DXT, ASTC) are decompressed block by block
+        # and the result is saved as PNG
+        img = decode_texture(
+            buf, file.width, file.height, file.texture_fmt, chunk_rows
+        )
+        img = np.flip(img, axis=0)
+        if as_array:
+            img.flags.writeable = False
+            return img
+        img = Image.fromarray(img, "RGBA")
         return img
 
     def export_mesh(self, file: MeshReader):
-        vertices = np.array(file.vertices, dtype=np.int32).reshape(-1, 3)
-        uv0 = np.array(file.uv0, dtype=np.float32).reshape(-1, 2)
-        indices = np.array(file.indices, dtype=np.int32).reshape(-1, 3)
-        lines = []
-        for v in vertices:
-            v = [str(x) for x in v]
-            lines.append(f"v {' '.join(v)}")
-        for uv in uv0:
-            uv = [str(x) for x in uv]
-            lines.append(f"vt {' '.join(uv)}")
-        for i in indices:
-            i = [f"{x}/{x}/{x}" for x in i]
-            lines.append(f"f {' '.join(i)}")
-        return lines
+        return Mesh(file.vertices, file.uv0, file.indices)
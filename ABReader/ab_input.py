@@ -2,7 +2,15 @@ from ABReader.texture2d_reader import Texture2DReader
 from ABReader.mesh_reader import MeshReader
 from ABReader.bin_reader import BinaryReader
 from ABReader.serialized_file import SerializedFile
+from bisect import bisect_right
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor as TPE
+from typing import Callable
 import json
+import lzma
+import mmap
+import os
+import threading
 
 CLASS_ID_TYPES = json.load(open("ABReader/class_types.json"))
 
@@ -21,8 +29,13 @@ class Flags:
     PAD_START = 0x200
 
 
-def is_serialized(content: bytes):
-    if len(content) < 20:
+def is_serialized(content: bytes, size: int = None):
+    """
+    Sniff whether `content` is the head of a serialized file.
+    `size` is the full node size when only a header window is passed.
+    """
+    size = len(content) if size is None else size
+    if size < 20:
         return False
     reader = BinaryReader(content)
     try:
@@ -40,76 +53,265 @@ def is_serialized(content: bytes):
     metadata["endian"] = reader.decode_hex(1 * 16, strip=False)
     metadata["reserved"] = reader.decode_hex(3 * 16, strip=False)
     if metadata["version"] >= 22:
-        if len(content) < 48:
+        if size < 48:
             return False
         metadata["metadata_size"] = reader.decode_hex(4 * 16, strip=False)
         metadata["file_size"] = reader.decode_hex(8 * 16, strip=False)
         metadata["offset"] = reader.decode_hex(8 * 16, strip=False)
-    if metadata["file_size"] != len(content):
+    if metadata["file_size"] != size:
         return False
-    if metadata["offset"] > len(content):
+    if metadata["offset"] > size:
         return False
     # print(metadata)
     return metadata
 
 
+def decompress_none(data: bytes, out: memoryview):
+    out[:] = data
+
+
+def decompress_lzma(data: bytes, out: memoryview):
+    # unity stores a 5-byte LZMA1 header (props byte + dict size) before the raw stream
+    props = data[0]
+    filters = [
+        {
+            "id": lzma.FILTER_LZMA1,
+            "dict_size": int.from_bytes(data[1:5], "little"),
+            "lc": props % 9,
+            "lp": props // 9 % 5,
+            "pb": props // 45,
+        }
+    ]
+    decompressor = lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=filters)
+    out[:] = decompressor.decompress(data[5:], max_length=len(out))
+
+
+def decompress_lz4(data: bytes, out: memoryview):
+    import lz4.block as f
+
+    out[:] = f.decompress(data, uncompressed_size=len(out))
+
+
+DECOMPRESSORS: dict[int, Callable[[bytes, memoryview], None]] = {
+    CompType.NONE: decompress_none,
+    CompType.LZMA: decompress_lzma,
+    CompType.LZ4: decompress_lz4,
+    CompType.LZ4HC: decompress_lz4,
+}
+
+
+def decompress_block(data: bytes, comp_type: int, out: memoryview):
+    """
+    Decompress `data` into the preallocated `out`, whose length is the uncompressed size.
+    """
+    if comp_type not in DECOMPRESSORS:
+        raise NotImplementedError(f"Unsupported block compression: {comp_type}")
+    DECOMPRESSORS[comp_type](data, out)
+    return out
+
+
+class BlockStorage:
+    """
+    Virtual view over the storage blocks of a bundle.
+
+    Block payloads are located once, then decompressed on demand: `read` only
+    touches the blocks covering the requested virtual range. `materialize`
+    decompresses every block into one preallocated buffer, on `processes`
+    threads (lz4 and lzma release the GIL).
+    """
+
+    def __init__(
+        self, reader: BinaryReader, blks_metadata: list[dict], processes: int = 1
+    ) -> None:
+        self.reader = reader
+        self.blks_metadata = blks_metadata
+        self.processes = processes
+        self.comp_offsets: list[int] = []
+        self.ucomp_offsets: list[int] = []
+        size = 0
+        # block payloads are stored back to back from the reader's position
+        for blk_metadata in blks_metadata:
+            self.comp_offsets.append(reader.ptr)
+            self.ucomp_offsets.append(size)
+            reader.move(blk_metadata["comp_size"])
+            size += blk_metadata["ucomp_size"]
+        self.size = size
+        self.data: bytearray = None
+        self._blocks: dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def block(self, idx: int):
+        blk = self._blocks.get(idx)
+        if blk is None:
+            with self._lock:
+                blk = self._blocks.get(idx)
+                if blk is None:
+                    blk = self._decompress(idx)
+                    self._blocks[idx] = blk
+        return blk
+
+    def _decompress(self, idx: int, out: memoryview = None):
+        blk_metadata = self.blks_metadata[idx]
+        comp_type = blk_metadata["props"] & Flags.COMP_TYPE
+        start = self.comp_offsets[idx]
+        data = self.reader.view[start : start + blk_metadata["comp_size"]]
+        if out is None:
+            if comp_type == CompType.NONE:
+                # stored blocks are served straight from the source buffer
+                return data
+            out = memoryview(bytearray(blk_metadata["ucomp_size"]))
+        return decompress_block(data, comp_type, out)
+
+    def materialize(self):
+        if self.data is None:
+            data = bytearray(self.size)
+            view = memoryview(data)
+            outs = [
+                view[offset : offset + blk_metadata["ucomp_size"]]
+                for offset, blk_metadata in zip(self.ucomp_offsets, self.blks_metadata)
+            ]
+            if self.processes > 1 and len(outs) > 1:
+                with TPE(min(self.processes, len(outs))) as pool:
+                    list(pool.map(self._decompress, range(len(outs)), outs))
+            else:
+                for i, out in enumerate(outs):
+                    self._decompress(i, out)
+            self.data = data
+            self._blocks.clear()
+        return self.data
+
+    def read(self, offset: int, size: int) -> memoryview:
+        if self.data is not None:
+            return memoryview(self.data)[offset : offset + size]
+        first = bisect_right(self.ucomp_offsets, offset) - 1
+        end = offset + size
+        blk_start = self.ucomp_offsets[first]
+        blk = self.block(first)
+        if end <= blk_start + len(blk):
+            # the range lives in a single block: no copy
+            return memoryview(blk)[offset - blk_start : end - blk_start]
+        out = bytearray(size)
+        pos = 0
+        i = first
+        while pos < size:
+            blk_start = self.ucomp_offsets[i]
+            blk = self.block(i)
+            lo = offset + pos - blk_start
+            hi = min(len(blk), end - blk_start)
+            out[pos : pos + hi - lo] = memoryview(blk)[lo:hi]
+            pos += hi - lo
+            i += 1
+        return memoryview(out)
+
+
+class LazyNodes(Mapping):
+    """
+    Read-only mapping from node path to node content, read from the block storage on access.
+    """
+
+    def __init__(self, ab_input: "ABInput", paths: list[str]) -> None:
+        self.ab_input = ab_input
+        self.paths = paths
+
+    def __getitem__(self, path: str):
+        if path not in self.paths:
+            raise KeyError(path)
+        return self.ab_input.read_node(path)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+
 class ABInput:
-    def __init__(self, path: str) -> None:
-        with open(path, "rb") as f:
-            self.data: bytes = f.read()
+    """
+    Reads an AssetBundle file.
+
+    With `lazy=True` the file is memory-mapped and storage blocks are only
+    decompressed when a node range covering them is read; resource nodes are
+    never read unless asked for through `read_node` or `resource_files`.
+
+    Nodes are kept in memory only. Pass `dump_dir` to also write each serialized
+    node to `ser_{i}.bin` and each resource node to `src_{i}.bin` in that directory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lazy: bool = False,
+        dump_dir: str = None,
+        processes: int = os.cpu_count(),
+    ) -> None:
+        self.path = path
+        self.lazy = lazy
+        self.dump_dir = dump_dir
+        if lazy:
+            with open(path, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            with open(path, "rb") as f:
+                self.data: bytes = f.read()
         self.bin_reader = BinaryReader(self.data)
         self.metadata = self.read_metadata()
         self.blks_metadata, self.nodes_metadata = self.read_blk_info()
+        if self.metadata["props"] & Flags.PAD_START:
+            self.bin_reader.align(16)
+        self.storage = BlockStorage(self.bin_reader, self.blks_metadata, processes)
         self.read_blocks()
 
     def read_metadata(self):
+        # UnityFS header, integers are big endian
         metadata = {}
-        metadata["type"] = self.bin_reader.decode_str()
-        metadata["version"] = self.bin_reader.decode_hex()
-        metadata["u_version"] = self.bin_reader.decode_str()
-        metadata["u_revision"] = self.bin_reader.decode_str()
-        metadata["size"] = self.bin_reader.decode_int()
-        metadata["comp_blk_size"] = self.bin_reader.decode_int()
-        metadata["ucomp_blk_size"] = self.bin_reader.decode_int()
-        metadata["props"] = self.bin_reader.decode_int()
+        metadata["type"] = self.bin_reader.cstr()
+        metadata["version"] = self.bin_reader.u32(">")
+        metadata["u_version"] = self.bin_reader.cstr()
+        metadata["u_revision"] = self.bin_reader.cstr()
+        metadata["size"] = self.bin_reader.i64(">")
+        metadata["comp_blk_size"] = self.bin_reader.u32(">")
+        metadata["ucomp_blk_size"] = self.bin_reader.u32(">")
+        metadata["props"] = self.bin_reader.u32(">")
         return metadata
 
     def read_blk_info(self):
-        if self.metadata["props"] & Flags.INFO_COMB:
-            data = self.bin_reader.read(self.metadata["comp_blk_size"])
-            # print(len(data))
-            # print([int(d, 16) for d in data])
+        if self.metadata["version"] >= 7:
+            self.bin_reader.align(16)
+        comp_blk_size = self.metadata["comp_blk_size"]
+        if self.metadata["props"] & Flags.INFO_END:
+            # block info at the end of the file, the blocks follow the header
+            blks_start = self.bin_reader.ptr
+            self.bin_reader.moveTo(len(self.bin_reader) - comp_blk_size)
+            data = self.bin_reader.read(comp_blk_size, strip=False)
+            self.bin_reader.moveTo(blks_start)
+        else:
+            data = self.bin_reader.read(comp_blk_size, strip=False)
         comp_type = self.metadata["props"] & Flags.COMP_TYPE
         # print(comp_type)
-        if comp_type in [CompType.LZ4, CompType.LZ4HC]:
-            import lz4.block as f
-
-            decomp_data: bytes = f.decompress(
-                bytes.fromhex("".join(data)),
-                uncompressed_size=self.metadata["ucomp_blk_size"],
-            )
-            decomp_reader = BinaryReader(decomp_data)
-            # print(decomp_reader.hexes)
-        _ = decomp_reader.read(16, strip=False)
-        blk_num = decomp_reader.decode_int()
-        # print(hash, blk_num)
+        decomp_data = bytearray(self.metadata["ucomp_blk_size"])
+        decompress_block(data, comp_type, memoryview(decomp_data))
+        decomp_reader = BinaryReader(decomp_data, endian=">")
+        decomp_reader.move(16)  # hash of the uncompressed data
+        blk_num = decomp_reader.i32()
         blks_metadata = [
             {
-                "ucomp_size": decomp_reader.decode_hex(4 * 16, strip=False),
-                "comp_size": decomp_reader.decode_hex(4 * 16, strip=False),
-                "props": decomp_reader.decode_hex(strip=True),
+                "ucomp_size": decomp_reader.u32(),
+                "comp_size": decomp_reader.u32(),
+                "props": decomp_reader.u16(),
             }
             for _ in range(blk_num)
         ]
         print("Blocks metadata: ", blks_metadata)
-        nodes = decomp_reader.decode_hex(4 * 16, strip=False)
-        # print(nodes)
+        nodes = decomp_reader.i32()
         nodes_metadata = [
             {
-                "offset": decomp_reader.decode_hex(8 * 16, strip=False),
-                "size": decomp_reader.decode_hex(8 * 16, strip=False),
-                "props": decomp_reader.decode_hex(4 * 16, strip=False),
-                "path": decomp_reader.decode_str(move_after=1),
+                "offset": decomp_reader.i64(),
+                "size": decomp_reader.i64(),
+                "props": decomp_reader.u32(),
+                "path": decomp_reader.cstr(),
             }
             for _ in range(nodes)
         ]
@@ -117,42 +319,52 @@ class ABInput:
         return blks_metadata, nodes_metadata
 
     def read_blocks(self):
-        blk_data = bytes()
-        # read and concat
-        for blk_metdata in self.blks_metadata:
-            comp_type = blk_metdata["props"] & Flags.COMP_TYPE
-            data = self.bin_reader.read(blk_metdata["comp_size"], strip=True)
-            if comp_type in [CompType.LZ4, CompType.LZ4HC]:
-                import lz4.block as f
-
-                decomp_data: bytes = f.decompress(
-                    bytes.fromhex("".join(data)),
-                    uncompressed_size=blk_metdata["ucomp_size"],
-                )
-                blk_data += decomp_data
-        assert len(blk_data) == sum([b["ucomp_size"] for b in self.blks_metadata])
-        files: list[bytes] = []
-        # write into files
-        for node_metadata in self.nodes_metadata:
+        if not self.lazy:
+            self.storage.materialize()
+        self.nodes: dict[str, dict] = {}
+        self.asset_files: list[SerializedFile] = []
+        self.resource_files: dict[str, bytes] = {}
+        resource_paths: list[str] = []
+        for i, node_metadata in enumerate(self.nodes_metadata):
             size = node_metadata["size"]
             offset = node_metadata["offset"]
             path = node_metadata["path"]
             print(path, size, offset)
-            files.append((path, blk_data[offset : offset + size]))
-        # print(len(files))
-        self.asset_files: list[SerializedFile] = []
-        self.resource_files: dict[str, bytes] = {}
-        for i, (path, file) in enumerate(files):
-            if is_serialized(file):
-                with open(f"ser_{i}.bin", "wb") as f:
-                    f.write(file)
+            self.nodes[path] = node_metadata
+            # only the header is needed to tell serialized files from resources
+            head = self.storage.read(offset, min(size, 256))
+            if is_serialized(head, size):
+                file = self.storage.read(offset, size)
+                self.dump_node(f"ser_{i}.bin", file)
                 sf = SerializedFile(file, path)
                 self.asset_files.append(sf)
+            elif self.lazy:
+                resource_paths.append(path)
+                if self.dump_dir:
+                    self.dump_node(f"src_{i}.bin", self.storage.read(offset, size))
             else:
-                with open(f"src_{i}.bin", "wb") as f:
-                    f.write(file)
+                file = self.storage.read(offset, size)
+                self.dump_node(f"src_{i}.bin", file)
                 self.resource_files[path] = file
-        # return files
+        if self.lazy:
+            self.resource_files = LazyNodes(self, resource_paths)
+
+    def dump_node(self, name: str, content: bytes):
+        if not self.dump_dir:
+            return
+        os.makedirs(self.dump_dir, exist_ok=True)
+        with open(os.path.join(self.dump_dir, name), "wb") as f:
+            f.write(content)
+
+    def read_node(self, path: str, offset: int = 0, size: int = None):
+        """
+        Read `size` bytes at `offset` inside node `path`, decompressing only the blocks it spans.
+        """
+        node_metadata = self.nodes[path]
+        if size is None:
+            size = node_metadata["size"] - offset
+        assert offset + size <= node_metadata["size"]
+        return self.storage.read(node_metadata["offset"] + offset, size)
 
     def read_assets(self):
         self.data_files = []
@@ -164,8 +376,8 @@ class ABInput:
                 # thanks to byte_start, we can directly jump to where the content begins for each section
                 af.reader.moveTo(obj_info["byte_start"])
                 if type == "Texture2D":
-                    self.data_files.append(Texture2DReader(af))
+                    self.data_files.append(Texture2DReader(af, obj_info["path_id"]))
                 elif type == "Mesh":
-                    self.data_files.append(MeshReader(af))
+                    self.data_files.append(MeshReader(af, obj_info["path_id"]))
                     # break
         print(self.data_files)
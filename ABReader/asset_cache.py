@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from typing import Any, Callable
+import hashlib
+import os
+import sys
+import threading
+import numpy as np
+
+
+def file_hash(path: str) -> str:
+    """
+    Hex blake2b digest of the file content, read in 1MB chunks.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class AssetCache:
+    """
+    On-disk cache of decoded assets (textures, rendered paintings) stored as raw arrays.
+
+    Entries are keyed by the source bundle paths plus their content hash, so an entry
+    is never served once a bundle changes; the stale entries of that bundle are dropped
+    on the next `put`. Content hashes are memoized per (path, mtime, size) to avoid
+    re-reading bundles that did not change. The cache is kept under `max_bytes` by
+    evicting the least recently used entries.
+
+    Attributes:
+        cache_dir (str): Directory holding the cache entries, created on the first `put`.
+        max_bytes (int): Size budget of the cache directory.
+    """
+
+    def __init__(self, cache_dir: str = ".cache", max_bytes: int = 2 << 30) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._hashes: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def content_hash(self, path: str):
+        st = os.stat(path)
+        memo = self._hashes.get(path)
+        if memo and memo[:2] == (st.st_mtime_ns, st.st_size):
+            return memo[2]
+        digest = file_hash(path)
+        self._hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def _prefix(self, paths: list[str], kind: str):
+        paths = "|".join(os.path.abspath(p) for p in paths)
+        return f"{kind}-{hashlib.blake2b(paths.encode(), digest_size=8).hexdigest()}"
+
+    def _entry(self, paths: str | list[str], kind: str):
+        paths = [paths] if isinstance(paths, str) else paths
+        content = hashlib.blake2b(
+            "|".join(self.content_hash(p) for p in paths).encode(), digest_size=16
+        ).hexdigest()
+        prefix = self._prefix(paths, kind)
+        return prefix, os.path.join(self.cache_dir, f"{prefix}-{content}.npz")
+
+    def get(self, paths: str | list[str], kind: str) -> list[np.ndarray] | None:
+        """
+        Return the arrays cached for the bundle(s) at `paths`, or None on a miss.
+        """
+        _, entry = self._entry(paths, kind)
+        try:
+            with np.load(entry) as npz:
+                arrays = [npz[f"arr_{i}"] for i in range(len(npz.files))]
+            os.utime(entry)  # LRU stamp
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        return arrays
+
+    def put(self, paths: str | list[str], kind: str, arrays: list[np.ndarray]):
+        prefix, entry = self._entry(paths, kind)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{entry}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, *arrays)
+        os.replace(tmp, entry)
+        with self._lock:
+            # drop entries of previous versions of the same bundle(s)
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.startswith(prefix + "-") and path != entry:
+                    self._remove(path)
+            self._evict()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, name))
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+
+def nbytes_of(obj: Any) -> int:
+    """
+    Rough in-memory size of a cached value: arrays, PIL images, parsed bundles and lists of them.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes_of(o) for o in obj)
+    if hasattr(obj, "getbands"):  # PIL image
+        return obj.size[0] * obj.size[1] * len(obj.getbands())
+    if hasattr(obj, "storage"):  # ABInput
+        return len(obj.storage)
+    return sys.getsizeof(obj)
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache bounded by the total size of its values.
+
+    Keys of file-backed values should include the file's mtime and size (see `file_key`)
+    so that changed files miss.
+
+    Attributes:
+        max_bytes (int): Size budget, values are measured with `nbytes_of`.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to load.
+    """
+
+    def __init__(self, max_bytes: int = 1 << 30) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Any, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: dict[Any, threading.Lock] = {}
+
+    @staticmethod
+    def file_key(kind: str, *paths: str):
+        key = [kind]
+        for path in paths:
+            st = os.stat(path)
+            key.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+        return tuple(key)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, nbytes: int = None):
+        nbytes = nbytes_of(value) if nbytes is None else nbytes
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return value
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, n) = self._entries.popitem(last=False)
+                self.nbytes -= n
+        return value
+
+    def get_or_load(self, key, loader: Callable[[], Any]):
+        """
+        Return the cached value of `key`, calling `loader` once on a miss even under concurrent requests.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        with lock:
+            # another thread may have loaded it meanwhile
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+            try:
+                return self.put(key, loader())
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+            }
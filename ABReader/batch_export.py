@@ -0,0 +1,204 @@
+"""
+Batch export of whole AssetBundles directories (e.g. AssetBundles/painting) over a
+process pool.
+
+Each bundle `src_dir/<rel>` is exported into `out_dir/<rel>/` (`{i}.png` textures and
+`mesh.obj`). Records are appended to `out_dir/manifest.jsonl` as soon as a chunk of
+bundles is done. A rerun skips the bundles whose recorded size and mtime still match, or
+whose content hash does when only the mtime changed, so an interrupted export resumes
+where it stopped.
+
+    python -m ABReader.batch_export AssetBundles/painting decoded/painting --processes 8
+"""
+
+from ABReader.ab_input import ABInput
+from ABReader.ab_exporter import ABExporter
+from ABReader.asset_cache import file_hash
+from concurrent.futures import ProcessPoolExecutor as PPE, as_completed
+import json
+import os
+import shutil
+import traceback
+
+UNITYFS_SIGNATURE = b"UnityFS\x00"
+
+
+def is_bundle(path: str):
+    with open(path, "rb") as f:
+        return f.read(len(UNITYFS_SIGNATURE)) == UNITYFS_SIGNATURE
+
+
+def export_bundle(src_dir: str, out_dir: str, rel: str) -> dict:
+    """
+    Export the bundle `src_dir/rel` into `out_dir/rel/`, replacing any previous output.
+
+    Returns:
+        dict: Manifest record with the bundle path, size, mtime (ns), content hash,
+        exported files and the error traceback (None on success).
+    """
+    path = os.path.join(src_dir, rel)
+    stat = os.stat(path)
+    record = {
+        "bundle": rel,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": file_hash(path),
+        "files": [],
+        "error": None,
+    }
+    bundle_out = os.path.join(out_dir, rel)
+    try:
+        if os.path.exists(bundle_out):
+            shutil.rmtree(bundle_out)
+        os.makedirs(bundle_out)
+        # the pool already spreads bundles over the cores
+        ab_input = ABInput(path, processes=1)
+        ab_input.read_assets()
+        ABExporter(ab_input).export(bundle_out)
+        record["files"] = sorted(os.listdir(bundle_out))
+    except Exception:
+        record["error"] = traceback.format_exc()
+    return record
+
+
+def export_chunk(src_dir: str, out_dir: str, rels: list[str]) -> list[dict]:
+    return [export_bundle(src_dir, out_dir, rel) for rel in rels]
+
+
+class BatchExporter:
+    """
+    Process-pool exporter of every bundle under a directory, resumable through its
+    manifest.
+
+    Attributes:
+        src_dir (str): Directory searched recursively for UnityFS bundles.
+        out_dir (str): Output directory, holding one sub-directory per bundle and the
+        manifest.
+        processes (int): Number of worker processes.
+        chunksize (int): Number of bundles handed to a worker at once. Larger chunks cut
+        the scheduling overhead, smaller ones balance uneven bundles better.
+    """
+
+    manifest_name = "manifest.jsonl"
+
+    def __init__(
+        self,
+        src_dir: str,
+        out_dir: str,
+        processes: int = os.cpu_count(),
+        chunksize: int = 4,
+    ) -> None:
+        self.src_dir = src_dir
+        self.out_dir = out_dir
+        self.processes = processes
+        self.chunksize = chunksize
+        self.manifest_path = os.path.join(out_dir, self.manifest_name)
+
+    def bundles(self) -> list[str]:
+        """
+        Paths of the bundles under `src_dir`, relative to it and sorted.
+        """
+        rels = []
+        for root, _, names in os.walk(self.src_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                if is_bundle(path):
+                    rels.append(os.path.relpath(path, self.src_dir))
+        return sorted(rels)
+
+    def load_manifest(self) -> dict[str, dict]:
+        """
+        Latest record of each bundle, later lines overriding earlier ones. A truncated
+        last line (crash while writing) is ignored.
+        """
+        manifest = {}
+        if not os.path.exists(self.manifest_path):
+            return manifest
+        with open(self.manifest_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                manifest[record["bundle"]] = record
+        return manifest
+
+    def is_done(self, rel: str, record: dict | None):
+        if not record or record["error"]:
+            return False
+        path = os.path.join(self.src_dir, rel)
+        stat = os.stat(path)
+        if "size" in record and record["size"] != stat.st_size:
+            return False
+        # only hash when the bundle was touched (or the record predates size and mtime)
+        if record.get("mtime") != stat.st_mtime_ns:
+            if record["hash"] != file_hash(path):
+                return False
+            # same content, refresh the record so the next run skips the hash
+            record["size"], record["mtime"] = stat.st_size, stat.st_mtime_ns
+        bundle_out = os.path.join(self.out_dir, rel)
+        return all(os.path.exists(os.path.join(bundle_out, f)) for f in record["files"])
+
+    def export(self, force: bool = False) -> dict[str, dict]:
+        """
+        Export the bundles not exported yet (all of them if `force`).
+
+        Returns:
+            dict: The manifest, bundle path -> record, after the run.
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        manifest = self.load_manifest()
+        todo, refreshed = [], []
+        for rel in self.bundles():
+            record = manifest.get(rel)
+            mtime = record.get("mtime") if record else None
+            if force or not self.is_done(rel, record):
+                todo.append(rel)
+            elif record["mtime"] != mtime:
+                refreshed.append(record)
+        print(f"{len(todo)} bundles to export, {len(manifest)} in manifest.")
+        chunks = [
+            todo[i : i + self.chunksize] for i in range(0, len(todo), self.chunksize)
+        ]
+        with open(self.manifest_path, "a") as f:
+            if refreshed:
+                self._write_records(f, manifest, refreshed)
+            if self.processes > 1:
+                with PPE(self.processes) as pool:
+                    futures = [
+                        pool.submit(export_chunk, self.src_dir, self.out_dir, chunk)
+                        for chunk in chunks
+                    ]
+                    for future in as_completed(futures):
+                        self._write_records(f, manifest, future.result())
+            else:
+                for chunk in chunks:
+                    records = export_chunk(self.src_dir, self.out_dir, chunk)
+                    self._write_records(f, manifest, records)
+        failed = [rel for rel in todo if manifest[rel]["error"]]
+        print(f"Exported {len(todo) - len(failed)} bundles, {len(failed)} failed.")
+        return manifest
+
+    def _write_records(self, f, manifest: dict[str, dict], records: list[dict]):
+        for record in records:
+            manifest[record["bundle"]] = record
+            f.write(json.dumps(record) + "\n")
+            if record["error"]:
+                print(f"Failed to export {record['bundle']}:\n{record['error']}")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("src_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=4)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    BatchExporter(args.src_dir, args.out_dir, args.processes, args.chunksize).export(
+        args.force
+    )
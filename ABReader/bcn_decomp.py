@@ -0,0 +1,83 @@
+# from Texture2DDecoderNative, bcn.cpp
+import numpy as np
+from ABReader.block_decomp import BlockDecoder
+
+
+def rgb565_to_rgb(c: np.ndarray):
+    """
+    Expand (N,) RGB565 colors into (N, 3) int32 RGB888.
+    """
+    c = c.astype(np.int32)
+    return np.stack(
+        [
+            (c >> 8 & 0xF8) | (c >> 13),
+            (c >> 3 & 0xFC) | (c >> 9 & 3),
+            (c << 3 & 0xF8) | (c >> 2 & 7),
+        ],
+        axis=-1,
+    )
+
+
+def rgb_to_argb32(rgb: np.ndarray, a: int | np.ndarray = 255):
+    rgb = rgb.astype(np.uint32)
+    return (
+        (np.uint32(a) << 24) | (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    ).astype(np.uint32)
+
+
+def decode_bc1(blks: np.ndarray):
+    """
+    Decode (N, 8) BC1 color blocks into (N, 16) row-major ARGB32 buffers.
+    """
+    q = blks[:, :4].copy().view("<u2")  # (N, 2)
+    q0, q1 = q[:, 0], q[:, 1]
+    c0, c1 = rgb565_to_rgb(q0), rgb565_to_rgb(q1)
+    four = (q0 > q1)[:, np.newaxis]
+    c2 = np.where(four, (c0 * 2 + c1) // 3, (c0 + c1) // 2)
+    c3 = np.where(four, (c0 + c1 * 2) // 3, 0)
+    palette = rgb_to_argb32(np.stack([c0, c1, c2, c3], axis=1))  # (N, 4)
+    idx = blks[:, 4:8].copy().view("<u4")  # (N, 1)
+    idx = idx >> (2 * np.arange(16, dtype=np.uint32)) & 3  # (N, 16)
+    return np.take_along_axis(palette, idx.astype(np.intp), axis=1)
+
+
+def decode_bc3_alpha(blks: np.ndarray):
+    """
+    Decode (N, 8) BC3 alpha blocks into (N, 16) row-major alpha values.
+    """
+    a0 = blks[:, 0].astype(np.int32)
+    a1 = blks[:, 1].astype(np.int32)
+    eight = (a0 > a1)[:, np.newaxis]
+    i = np.arange(1, 7, dtype=np.int32)
+    interp8 = (a0[:, np.newaxis] * (7 - i) + a1[:, np.newaxis] * i) // 7  # (N, 6)
+    i = np.arange(1, 5, dtype=np.int32)
+    interp6 = (a0[:, np.newaxis] * (5 - i) + a1[:, np.newaxis] * i) // 5  # (N, 4)
+    a0, a1 = a0[:, np.newaxis], a1[:, np.newaxis]
+    interp6 = np.concatenate(
+        [interp6, np.zeros_like(a0), np.full_like(a0, 255)], axis=1
+    )
+    palette = np.concatenate(
+        [a0, a1, np.where(eight, interp8, interp6)], axis=1
+    )  # (N, 8)
+    bits = np.zeros((blks.shape[0], 8), dtype=np.uint8)
+    bits[:, :6] = blks[:, 2:8]
+    bits = bits.view("<u8")  # (N, 1)
+    idx = bits >> (3 * np.arange(16, dtype=np.uint64)) & 7  # (N, 16)
+    return np.take_along_axis(palette, idx.astype(np.intp), axis=1)
+
+
+class DXT1Decoder(BlockDecoder):
+    blk_bytes = 8
+    jit_kernel = "decode_dxt1"
+
+    def _decode_blocks(self, blks: np.ndarray):
+        return decode_bc1(blks)
+
+
+class DXT5Decoder(BlockDecoder):
+    jit_kernel = "decode_dxt5"
+
+    def _decode_blocks(self, blks: np.ndarray):
+        buffers = decode_bc1(blks[:, 8:])
+        alpha = decode_bc3_alpha(blks[:, :8]).astype(np.uint32)
+        return (buffers & 0x00FF_FFFF) | (alpha << 24)
@@ -1,19 +1,33 @@
+import struct
+import numpy as np
+
+_STRUCTS = {
+    (fmt, endian): struct.Struct(endian + fmt)
+    for fmt in "BbHhIiQqf"
+    for endian in "<>"
+}
+
+
 class BinaryReader:
-    def __init__(self, data: bytes) -> None:
+    """
+    Byte-native reader over a memoryview of the original buffer.
+
+    The typed readers (`u8`, `u16`, `u32`, `u64`, `i32`, `f32`...) are built on
+    `struct.unpack_from` and honour `endian` ("<" little, ">" big) unless overridden
+    per call. `read` returns zero-copy memoryview slices and `read_array` returns
+    zero-copy NumPy views for bulk payloads. The legacy `decode_*` surface is kept
+    so that callers can be migrated incrementally.
+    """
+
+    def __init__(self, data: bytes, endian: str = "<") -> None:
         self.data = data
-        self.hexes: list[str] = self._decode_hex()
-        self.len = len(self.hexes)
-        self.ptr = 0  # pointing to the next hex to read
+        self.view = memoryview(data).cast("B")
+        self.len = len(self.view)
+        self.endian = endian
+        self.ptr = 0  # pointing to the next byte to read
 
     def __len__(self):
-        return len(self.hexes)
-
-    def _decode_hex(self):
-        hex_data_str = self.data.hex()
-        hexes = []
-        for i, hd in enumerate(hex_data_str[::2]):
-            hexes.append(hd + hex_data_str[2 * i + 1])
-        return hexes
+        return self.len
 
     def move(self, bias: int):
         self.ptr += bias
@@ -24,64 +38,128 @@ class BinaryReader:
         return self
 
     def align_nonzero(self):
-        while int(self.hexes[self.ptr], 16) == 0 and self.ptr < self.len:
+        while self.ptr < self.len and self.view[self.ptr] == 0:
             self.ptr += 1
         return self
 
     def align(self, factor: int = 4):
-        while self.ptr % factor != 0:
+        self.ptr = (self.ptr + factor - 1) // factor * factor
+        return self
+
+    # typed readers
+
+    def _unpack(self, fmt: str, endian: str = None):
+        s = _STRUCTS[(fmt, endian or self.endian)]
+        (value,) = s.unpack_from(self.view, self.ptr)
+        self.ptr += s.size
+        return value
+
+    def u8(self):
+        return self._unpack("B")
+
+    def i8(self):
+        return self._unpack("b")
+
+    def u16(self, endian: str = None):
+        return self._unpack("H", endian)
+
+    def i16(self, endian: str = None):
+        return self._unpack("h", endian)
+
+    def u32(self, endian: str = None):
+        return self._unpack("I", endian)
+
+    def i32(self, endian: str = None):
+        return self._unpack("i", endian)
+
+    def u64(self, endian: str = None):
+        return self._unpack("Q", endian)
+
+    def i64(self, endian: str = None):
+        return self._unpack("q", endian)
+
+    def f32(self, endian: str = None):
+        return self._unpack("f", endian)
+
+    def read_array(self, dtype, count: int) -> np.ndarray:
+        """
+        Read `count` items of `dtype` as a read-only NumPy view over the buffer.
+        Multi-byte dtypes without an explicit byte order follow `self.endian`.
+        """
+        dtype = np.dtype(dtype)
+        if dtype.byteorder == "=" and dtype.itemsize > 1:
+            dtype = dtype.newbyteorder(self.endian)
+        arr = np.frombuffer(self.view, dtype=dtype, count=count, offset=self.ptr)
+        self.ptr += dtype.itemsize * count
+        return arr
+
+    def cstr(self):
+        """
+        Read a null-terminated string, consuming the terminator.
+        """
+        end = self.ptr
+        while end < self.len and self.view[end] != 0:
+            end += 1
+        s = self.view[self.ptr : end].tobytes().decode()
+        self.ptr = end + 1
+        return s
+
+    def aligned_str(self, endian: str = None):
+        """
+        Read a uint32-length-prefixed string and align the stream to 4 bytes.
+        """
+        length = self.u32(endian)
+        s = self.read(length, strip=False).tobytes().decode()
+        self.align(4)
+        return s
+
+    # legacy surface
+
+    def _strip(self):
+        while self.ptr < self.len and self.view[self.ptr] == 0:
             self.ptr += 1
 
     def decode_str(self, move_after: int = 0):
         # strip leading zeros
-        while int(self.hexes[self.ptr], 16) == 0 and self.ptr < self.len:
-            self.ptr += 1
+        self._strip()
         # get data
-        data = ""
-        while int(self.hexes[self.ptr], 16) != 0 and self.ptr < self.len:
-            data += self.hexes[self.ptr]
+        start = self.ptr
+        while self.ptr < self.len and self.view[self.ptr] != 0:
             self.ptr += 1
+        data = self.view[start : self.ptr].tobytes()
         self.move(move_after)
-        return bytes.fromhex(data).decode()
+        return data.decode()
 
     def decode_hex(self, size=16, strip=True, reverse=False):
         if strip:
-            while int(self.hexes[self.ptr], 16) == 0 and self.ptr < self.len:
-                self.ptr += 1
-        data = []
-        for _ in range(size // 16):
-            data.append(self.hexes[self.ptr])
-            self.ptr += 1
-        if reverse:
-            data = data[::-1]
-        # print(data)
-        return int("".join(data), 16)
+            self._strip()
+        n = size // 16
+        data = self.view[self.ptr : self.ptr + n]
+        self.ptr += n
+        return int.from_bytes(data, "little" if reverse else "big")
 
     def decode_int(self):
         # strip leading zeros
-        while int(self.hexes[self.ptr], 16) == 0 and self.ptr < self.len:
-            self.ptr += 1
+        self._strip()
         # get data
-        data = ""
-        while int(self.hexes[self.ptr], 16) != 0 and self.ptr < self.len:
-            data += self.hexes[self.ptr]
+        start = self.ptr
+        while self.ptr < self.len and self.view[self.ptr] != 0:
             self.ptr += 1
-        return int(data, 16)
+        return int.from_bytes(self.view[start : self.ptr], "big")
 
     def decode_aligned_str(self, reverse=False):
         # first read a int32 as length
         length = self.decode_hex(4 * 16, strip=False, reverse=reverse)
-        str_hexes = self.read(length, strip=False)
+        data = self.read(length, strip=False)
         self.align(4)
-        return bytes.fromhex("".join(str_hexes)).decode()
+        return data.tobytes().decode()
 
-    def read(self, size: int, strip=True):
+    def read(self, size: int, strip=True) -> memoryview:
         if strip:
-            while int(self.hexes[self.ptr], 16) == 0 and self.ptr < self.len:
-                self.ptr += 1
-        data = self.hexes[self.ptr : self.ptr + size]
+            self._strip()
+        data = self.view[self.ptr : self.ptr + size]
         self.ptr += size
         return data
 
     def get_data(self, bias=10):
-        return " ".join(self.hexes[self.ptr : self.ptr + bias])
+        return self.view[self.ptr : self.ptr + bias].hex(" ")
@@ -0,0 +1,125 @@
+import numpy as np
+
+BACKENDS = ("auto", "numpy", "numba")
+
+
+class BlockDecoder:
+    """
+    Batched decoder of block-compressed textures.
+
+    Subclasses set the block geometry (`blk_w` x `blk_h` pixels in `blk_bytes` bytes) and
+    implement `_decode_blocks`, which turns an (N, blk_bytes) array of blocks into
+    (N, blk_w * blk_h) row-major ARGB32 pixel buffers. Blocks are stored row by row,
+    left to right, and the decoded buffers are scattered into the (width * height)
+    ARGB32 `img`.
+
+    Subclasses with a compiled counterpart name it in `jit_kernel`, a function of
+    ABReader.jit_decomp with the same contract as `_decode_blocks`.
+    """
+
+    blk_w = 4
+    blk_h = 4
+    blk_bytes = 16
+    jit_kernel: str = None
+
+    def __init__(
+        self,
+        data: list[int] | np.ndarray,
+        width: int,
+        height: int,
+        backend: str = "auto",
+    ) -> None:
+        """
+        Args:
+            backend (str): "numpy", "numba" or "auto", which picks the Numba kernel when
+            Numba is installed and the format has one, and NumPy otherwise.
+        """
+        assert backend in BACKENDS, f"Unknown backend: {backend}"
+        self.backend = self._resolve_backend(backend)
+        self.data = np.asarray(data, dtype=np.uint8)
+        self.width = width
+        self.height = height
+        self.img = np.zeros((width * height), dtype=np.uint32)
+        self.num_blks_x = (width + self.blk_w - 1) // self.blk_w
+        self.num_blks_y = (height + self.blk_h - 1) // self.blk_h
+
+    def decode(self, chunk_rows: int = None, processes: int = 1):
+        """
+        Decode the texture into `self.img`.
+
+        Args:
+            chunk_rows (int): Number of block rows decoded at once. Temporaries scale with
+            the chunk instead of the whole texture, bounding peak memory. Default is None,
+            decoding all blocks at once.
+            processes (int): Number of threads decoding chunks concurrently. Default is 1.
+
+        Returns:
+            np.ndarray: The (width * height) ARGB32 image.
+        """
+        l = len(self.data)
+        print(f"Length of data: {l}")
+        blks = self.data[: self.num_blks_x * self.num_blks_y * self.blk_bytes].reshape(
+            -1, self.blk_bytes
+        )
+        if not chunk_rows or chunk_rows >= self.num_blks_y:
+            self._copy_blk_bufs(self._run_blocks(blks))
+            return self.img
+        chunks = [
+            (by, min(by + chunk_rows, self.num_blks_y))
+            for by in range(0, self.num_blks_y, chunk_rows)
+        ]
+
+        def decode_chunk(chunk: tuple[int, int]):
+            by1, by2 = chunk
+            buffers = self._run_blocks(
+                blks[by1 * self.num_blks_x : by2 * self.num_blks_x]
+            )
+            self._copy_blk_bufs(buffers, by1, by2)
+
+        if processes > 1:
+            from concurrent.futures import ThreadPoolExecutor as TPE
+
+            with TPE(processes) as pool:
+                list(pool.map(decode_chunk, chunks))
+        else:
+            for chunk in chunks:
+                decode_chunk(chunk)
+        return self.img
+
+    def _decode_blocks(self, blks: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _resolve_backend(self, backend: str):
+        if backend == "numpy":
+            return backend
+        from ABReader import jit_decomp
+
+        if jit_decomp.HAS_NUMBA and self.jit_kernel:
+            return "numba"
+        if backend == "numba":
+            raise NotImplementedError(
+                f"No Numba kernel for {type(self).__name__} (is numba installed?)"
+            )
+        return "numpy"
+
+    def _run_blocks(self, blks: np.ndarray) -> np.ndarray:
+        if self.backend == "numba":
+            from ABReader import jit_decomp
+
+            return getattr(jit_decomp, self.jit_kernel)(np.ascontiguousarray(blks))
+        return self._decode_blocks(blks)
+
+    def _copy_blk_bufs(self, buffers: np.ndarray, by1: int = 0, by2: int = None):
+        """
+        Scatter the (num_blks, blk_w * blk_h) row-major buffers of block rows [by1, by2)
+        into the image in one pass, cropping the blocks that overhang the right and bottom edges.
+        """
+        bw, bh = self.blk_w, self.blk_h
+        by2 = self.num_blks_y if by2 is None else by2
+        blks = buffers.reshape(by2 - by1, self.num_blks_x, bh, bw)
+        img = self.img.reshape(self.height, self.width)
+        y1, y2 = by1 * bh, min(by2 * bh, self.height)
+        # (blk_y, y, blk_x, x) is the row-major pixel order of the padded image
+        img[y1:y2] = blks.transpose(0, 2, 1, 3).reshape(
+            (by2 - by1) * bh, self.num_blks_x * bw
+        )[: y2 - y1, : self.width]
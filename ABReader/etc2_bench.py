@@ -0,0 +1,190 @@
+"""
+Conformance and throughput benchmark of the ETC2A8 decoder.
+
+Synthetic block streams cover every color mode (individual, differential, T, H and planar)
+with and without alpha modifiers. Each backend of `ETC2A8Decoder` is checked bit for bit
+against a reference decoder and timed in megapixels per second. The reference is the
+optional texture2ddecoder package. When it is missing, the NumPy backend stands in and is
+left out of the checked rows, and a run that checks no backend at all fails.
+
+    python -m ABReader.etc2_bench --sizes 256 1024 2048 --repeat 3
+"""
+
+from ABReader.etc2_decomp import ETC2A8Decoder
+from ABReader import jit_decomp
+from typing import Callable
+import contextlib
+import io
+import time
+import numpy as np
+
+COLOR_MODES = ("individual", "differential", "T", "H", "planar")
+ALPHA_MODES = ("flat", "modifier")
+# (width, height) of the conformance textures, the second one crops the edge blocks
+CONFORMANCE_SIZES = ((64, 1024), (61, 37))
+
+
+def color_mode_of(etc2_blks: np.ndarray):
+    """
+    Classify (N, 8) ETC2 color blocks, returning the (N,) index into COLOR_MODES.
+    """
+    diff = (etc2_blks[:, 3] & 2) != 0
+    overflow = []
+    for c in range(3):
+        base = (etc2_blks[:, c] & 0xF8).astype(np.int16)
+        delta = (etc2_blks[:, c] << 3 & 0x18).astype(np.int16) - (
+            etc2_blks[:, c] << 3 & 0x20
+        ).astype(np.int16)
+        overflow.append(((base + delta) < 0) | ((base + delta) > 255))
+    mode = np.ones(len(etc2_blks), dtype=np.int64)  # differential
+    mode[diff & overflow[2]] = 4
+    mode[diff & overflow[1]] = 3
+    mode[diff & overflow[0]] = 2
+    mode[~diff] = 0
+    return mode
+
+
+def synth_blocks(
+    num_blks: int, color_mode: str, alpha_mode: str, rng: np.random.Generator
+):
+    """
+    Generate `num_blks` random ETC2A8 blocks of the given color and alpha modes.
+    """
+    target = COLOR_MODES.index(color_mode)
+    etc2_blks = np.empty((0, 8), dtype=np.uint8)
+    while len(etc2_blks) < num_blks:
+        # rejection sampling, the rarest mode (planar) hits about 1/18 of the draws
+        draw = rng.integers(0, 256, (num_blks * 24, 8), dtype=np.uint8)
+        if target == 0:
+            draw[:, 3] &= 0xFD
+        else:
+            draw[:, 3] |= 2
+        draw = draw[color_mode_of(draw) == target]
+        etc2_blks = np.concatenate([etc2_blks, draw])
+    alpha_blks = rng.integers(0, 256, (num_blks, 8), dtype=np.uint8)
+    if alpha_mode == "flat":
+        alpha_blks[:, 1] &= 0x0F
+    else:
+        alpha_blks[:, 1] |= rng.integers(1, 16, num_blks, dtype=np.uint8) << 4
+    return np.concatenate([alpha_blks, etc2_blks[:num_blks]], axis=1)
+
+
+def synth_texture(width: int, height: int, rng: np.random.Generator):
+    """
+    Generate an ETC2A8 payload mixing all color and alpha modes evenly.
+    """
+    num_blks = ((width + 3) // 4) * ((height + 3) // 4)
+    combos = [(c, a) for c in COLOR_MODES for a in ALPHA_MODES]
+    per_combo = (num_blks + len(combos) - 1) // len(combos)
+    blks = np.concatenate([synth_blocks(per_combo, c, a, rng) for c, a in combos])
+    return rng.permutation(blks)[:num_blks].reshape(-1)
+
+
+def reference_decoder() -> tuple[str, Callable[[np.ndarray, int, int], np.ndarray]]:
+    try:
+        import texture2ddecoder
+    except ImportError:
+        return "numpy", lambda data, w, h: decode(data, w, h, "numpy")
+
+    def decode_ref(data: np.ndarray, width: int, height: int):
+        img = texture2ddecoder.decode_etc2a8(data.tobytes(), width, height)
+        return np.frombuffer(img, dtype=np.uint32)
+
+    return "texture2ddecoder", decode_ref
+
+
+def available_backends():
+    return ["numpy", "numba"] if jit_decomp.HAS_NUMBA else ["numpy"]
+
+
+def decode(data: np.ndarray, width: int, height: int, backend: str):
+    # the decoder prints the payload length, keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ETC2A8Decoder(data, width, height, backend=backend).decode()
+
+
+def check_conformance(
+    backends: list[str],
+    sizes: list[tuple[int, int]] = CONFORMANCE_SIZES,
+    seed: int = 0,
+) -> dict[tuple[str, str, str, str], int]:
+    """
+    Decode every (color mode, alpha mode) stream of each size with each backend, except the
+    backend standing in as the reference.
+
+    Returns:
+        dict: (backend, color mode, alpha mode, "WxH") -> number of pixels differing from
+        the reference.
+    """
+    rng = np.random.default_rng(seed)
+    ref_name, ref = reference_decoder()
+    backends = [backend for backend in backends if backend != ref_name]
+    mismatches = {}
+    for width, height in sizes:
+        num_blks = ((width + 3) // 4) * ((height + 3) // 4)
+        for color_mode in COLOR_MODES:
+            for alpha_mode in ALPHA_MODES:
+                data = synth_blocks(num_blks, color_mode, alpha_mode, rng).reshape(-1)
+                expected = ref(data, width, height)
+                for backend in backends:
+                    out = decode(data, width, height, backend)
+                    key = (backend, color_mode, alpha_mode, f"{width}x{height}")
+                    mismatches[key] = int(np.count_nonzero(out != expected))
+    return mismatches
+
+
+def benchmark(
+    backends: list[str], sizes: list[int], repeat: int = 3, seed: int = 0
+) -> dict[tuple[str, int], float]:
+    """
+    Time square textures of each size, keeping the best of `repeat` runs.
+
+    Returns:
+        dict: (backend, size) -> megapixels per second.
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+    for size in sizes:
+        data = synth_texture(size, size, rng)
+        for backend in backends:
+            decode(data, 16, 16, backend)  # warm up, compiles the Numba kernels
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                decode(data, size, size, backend)
+                best = min(best, time.perf_counter() - start)
+            results[(backend, size)] = size * size / best / 1e6
+    return results
+
+
+def main(sizes: list[int], repeat: int = 3, backends: list[str] = None):
+    backends = backends or available_backends()
+    ref_name, _ = reference_decoder()
+    print(f"Conformance against {ref_name}:")
+    if ref_name in backends:
+        print(f"  {ref_name:6s} NOT CHECKED, texture2ddecoder is not installed")
+    mismatches = check_conformance(backends)
+    for (backend, color_mode, alpha_mode, size), n in mismatches.items():
+        status = "ok" if n == 0 else f"FAIL ({n} pixels)"
+        print(f"  {backend:6s} {color_mode:12s} {alpha_mode:8s} {size:8s} {status}")
+    if not mismatches:
+        print("  FAIL, no backend was checked against a reference")
+    print("Throughput (MP/s):")
+    print("  " + "size".ljust(8) + "".join(b.rjust(10) for b in backends))
+    results = benchmark(backends, sizes, repeat)
+    for size in sizes:
+        row = "".join(f"{results[(b, size)]:10.2f}" for b in backends)
+        print(f"  {size:<8d}{row}")
+    return bool(mismatches) and not any(mismatches.values())
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024, 2048])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", choices=["numpy", "numba"])
+    args = parser.parse_args()
+    sys.exit(0 if main(args.sizes, args.repeat, args.backends) else 1)
@@ -0,0 +1,305 @@
+# Numba backend of the block decoders: each block is decoded in one fused pass,
+# blocks are spread over threads with prange. The kernels mirror the NumPy decoders
+# in etc2_decomp.py and bcn_decomp.py bit for bit.
+import os
+import numpy as np
+from ABReader.etc2_decomp import (
+    WRITE_ORDER,
+    DISTANCE,
+    ETC1_SUBBLOCK_TABLE,
+    ETC1_MODIFIER_TABLE,
+    ETC2_ALPHA_MOD_TABLE,
+)
+
+try:
+    import numba
+    from numba import njit, prange
+except ImportError:
+    HAS_NUMBA = False
+else:
+    HAS_NUMBA = True
+    # kernels are launched from pool threads (chunked decode, threaded export), after
+    # which TBB workers keep the interpreter from exiting; prefer OpenMP unless a layer
+    # is chosen
+    layer_vars = {"NUMBA_THREADING_LAYER", "NUMBA_THREADING_LAYER_PRIORITY"}
+    if not layer_vars & set(os.environ):
+        numba.config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+
+ETC_MODES = {"etc2": 0, "etc1": 1, "etc2a1": 2}
+
+if HAS_NUMBA:
+    _WRITE_ORDER = np.array(WRITE_ORDER, dtype=np.int64)
+    _DISTANCE = DISTANCE.astype(np.int64)
+    _SUBBLOCK = ETC1_SUBBLOCK_TABLE.astype(np.int64)
+    _MODIFIER = ETC1_MODIFIER_TABLE.astype(np.int64)
+    _ALPHA_MOD = ETC2_ALPHA_MOD_TABLE.astype(np.int64)
+
+    @njit(inline="always")
+    def _clip(x):
+        return 0 if x < 0 else (255 if x > 255 else x)
+
+    @njit(inline="always")
+    def _argb(r, g, b, a):
+        return np.uint32((a << 24) | (r << 16) | (g << 8) | b)
+
+    @njit(inline="always")
+    def _apply(r, g, b, m):
+        return _argb(_clip(r + m), _clip(g + m), _clip(b + m), 255)
+
+    @njit
+    def _etc_rgb_block(d, out, mode):
+        d0, d1, d2, d3 = np.int64(d[0]), np.int64(d[1]), np.int64(d[2]), np.int64(d[3])
+        d4, d5, d6, d7 = np.int64(d[4]), np.int64(d[5]), np.int64(d[6]), np.int64(d[7])
+        j = d6 << 8 | d7
+        k = d4 << 8 | d5
+        opaque = (d3 & 2) != 0
+        punch = mode == 2 and not opaque
+        if mode == 2 or (d3 & 2) != 0:
+            r = d0 & 0xF8
+            dr = (d0 << 3 & 0x18) - (d0 << 3 & 0x20)
+            g = d1 & 0xF8
+            dg = (d1 << 3 & 0x18) - (d1 << 3 & 0x20)
+            b = d2 & 0xF8
+            db = (d2 << 3 & 0x18) - (d2 << 3 & 0x20)
+            if mode != 1 and (r + dr < 0 or r + dr > 255):  # T mode
+                c00 = (d0 << 3 & 0xC0) | (d0 << 4 & 0x30) | (d0 >> 1 & 0xC) | (d0 & 3)
+                c01 = ((d1 & 0xF0) | d1 >> 4) & 0xFF
+                c02 = ((d1 & 0x0F) | d1 << 4) & 0xFF
+                c10 = ((d2 & 0xF0) | d2 >> 4) & 0xFF
+                c11 = ((d2 & 0x0F) | d2 << 4) & 0xFF
+                c12 = ((d3 & 0xF0) | d3 >> 4) & 0xFF
+                dist = _DISTANCE[(d3 >> 1 & 6) | (d3 & 1)]
+                k <<= 1
+                for i in range(16):
+                    idx = (k & 2) | (j & 1)
+                    if idx == 0:
+                        px = _apply(c00, c01, c02, 0)
+                    elif idx == 1:
+                        px = _apply(c10, c11, c12, dist)
+                    elif idx == 2:
+                        px = _apply(c10, c11, c12, 0)
+                        if punch:
+                            px &= np.uint32(0x00FF_FFFF)
+                    else:
+                        px = _apply(c10, c11, c12, -dist)
+                    out[_WRITE_ORDER[i]] = px
+                    j >>= 1
+                    k >>= 1
+                return
+            if mode != 1 and (g + dg < 0 or g + dg > 255):  # H mode
+                c00 = ((d0 << 1 & 0xF0) | (d0 >> 3 & 0xF)) & 0xFF
+                c01 = (d0 << 5 & 0xE0) | (d1 & 0x10)
+                c01 = (c01 | c01 >> 4) & 0xFF
+                c02 = (d1 & 8) | (d1 << 1 & 6) | d2 >> 7
+                c02 = (c02 | c02 << 4) & 0xFF
+                c10 = ((d2 << 1 & 0xF0) | (d2 >> 3 & 0xF)) & 0xFF
+                c11 = (d2 << 5 & 0xE0) | (d3 >> 3 & 0x10)
+                c11 = (c11 | c11 >> 4) & 0xFF
+                c12 = ((d3 << 1 & 0xF0) | (d3 >> 3 & 0xF)) & 0xFF
+                di = (d3 & 4) | (d3 << 1 & 2)
+                if (
+                    c00 > c10
+                    or (c00 == c10 and c01 > c11)
+                    or (c00 == c10 and c01 == c11 and c02 >= c12)
+                ):
+                    di += 1
+                dist = _DISTANCE[di]
+                k <<= 1
+                for i in range(16):
+                    idx = (k & 2) | (j & 1)
+                    if idx == 0:
+                        px = _apply(c00, c01, c02, dist)
+                    elif idx == 1:
+                        px = _apply(c00, c01, c02, -dist)
+                    elif idx == 2:
+                        px = _apply(c10, c11, c12, dist)
+                        if punch:
+                            px &= np.uint32(0x00FF_FFFF)
+                    else:
+                        px = _apply(c10, c11, c12, -dist)
+                    out[_WRITE_ORDER[i]] = px
+                    j >>= 1
+                    k >>= 1
+                return
+            if mode != 1 and (b + db < 0 or b + db > 255):  # planar mode
+                c00 = ((d0 << 1 & 0xFC) | (d0 >> 5 & 3)) & 0xFF
+                c01 = ((d0 << 7 & 0x80) | (d1 & 0x7E) | (d0 & 1)) & 0xFF
+                c02 = (d1 << 7 & 0x80) | (d2 << 2 & 0x60)
+                c02 |= (d2 << 3 & 0x18) | (d3 >> 5 & 4)
+                c02 = (c02 | c02 >> 6) & 0xFF
+                c10 = ((d3 << 1 & 0xF8) | (d3 << 2 & 4) | (d3 >> 5 & 3)) & 0xFF
+                c11 = ((d4 & 0xFE) | d4 >> 7) & 0xFF
+                c12 = (d4 << 7 & 0x80) | (d5 >> 1 & 0x7C)
+                c12 = (c12 | c12 >> 6) & 0xFF
+                c20 = ((d5 << 5 & 0xE0) | (d6 >> 3 & 0x1C) | (d5 >> 1 & 3)) & 0xFF
+                c21 = ((d6 << 3 & 0xF8) | (d7 >> 5 & 0x6) | (d6 >> 4 & 1)) & 0xFF
+                c22 = (d7 << 2 | (d7 >> 4 & 3)) & 0xFF
+                i = 0
+                for y in range(4):
+                    for x in range(4):
+                        out[i] = _argb(
+                            _clip(
+                                (x * (c10 - c00) + y * (c20 - c00) + 4 * c00 + 2) >> 2
+                            ),
+                            _clip(
+                                (x * (c11 - c01) + y * (c21 - c01) + 4 * c01 + 2) >> 2
+                            ),
+                            _clip(
+                                (x * (c12 - c02) + y * (c22 - c02) + 4 * c02 + 2) >> 2
+                            ),
+                            255,
+                        )
+                        i += 1
+                return
+            # differential mode
+            c00 = (r | r >> 5) & 0xFF
+            c01 = (g | g >> 5) & 0xFF
+            c02 = (b | b >> 5) & 0xFF
+            c10 = (r + dr) & 0xFF
+            c11 = (g + dg) & 0xFF
+            c12 = (b + db) & 0xFF
+            c10 = (c10 | c10 >> 5) & 0xFF
+            c11 = (c11 | c11 >> 5) & 0xFF
+            c12 = (c12 | c12 >> 5) & 0xFF
+        else:  # individual mode
+            c00 = ((d0 & 0xF0) | d0 >> 4) & 0xFF
+            c01 = ((d1 & 0xF0) | d1 >> 4) & 0xFF
+            c02 = ((d2 & 0xF0) | d2 >> 4) & 0xFF
+            c10 = ((d0 & 0x0F) | d0 << 4) & 0xFF
+            c11 = ((d1 & 0x0F) | d1 << 4) & 0xFF
+            c12 = ((d2 & 0x0F) | d2 << 4) & 0xFF
+        code0 = d3 >> 5
+        code1 = d3 >> 2 & 7
+        table = d3 & 1
+        for i in range(16):
+            s = _SUBBLOCK[table, i]
+            m = _MODIFIER[code0 if s == 0 else code1, j & 1]
+            if k & 1:
+                m = -m
+            if punch and (j & 1) == 0:
+                m = 0
+            if s == 0:
+                px = _apply(c00, c01, c02, m)
+            else:
+                px = _apply(c10, c11, c12, m)
+            if punch and (k & 1) == 1 and (j & 1) == 0:
+                px &= np.uint32(0x00FF_FFFF)
+            out[_WRITE_ORDER[i]] = px
+            j >>= 1
+            k >>= 1
+
+    @njit
+    def _etc2_alpha_block(d, out):
+        a = np.int64(d[0])
+        if d[1] & 0xF0:
+            multp = np.int64(d[1]) >> 4
+            table = np.int64(d[1]) & 0xF
+            # only the low 48 bits of the big endian word hold indices
+            l = np.int64(0)
+            for b in range(2, 8):
+                l = l << 8 | np.int64(d[b])
+            for i in range(16):
+                p = _WRITE_ORDER[15 - i]
+                alpha = _clip(a + multp * _ALPHA_MOD[table, l & 7])
+                out[p] = (out[p] & np.uint32(0x00FF_FFFF)) | np.uint32(alpha << 24)
+                l >>= 3
+        else:
+            for i in range(16):
+                out[i] = (out[i] & np.uint32(0x00FF_FFFF)) | np.uint32(a << 24)
+
+    @njit
+    def _rgb565(c):
+        return (
+            (c >> 8 & 0xF8) | (c >> 13),
+            (c >> 3 & 0xFC) | (c >> 9 & 3),
+            (c << 3 & 0xF8) | (c >> 2 & 7),
+        )
+
+    @njit
+    def _bc1_block(d, out):
+        q0 = np.int64(d[0]) | np.int64(d[1]) << 8
+        q1 = np.int64(d[2]) | np.int64(d[3]) << 8
+        r0, g0, b0 = _rgb565(q0)
+        r1, g1, b1 = _rgb565(q1)
+        palette = np.empty(4, dtype=np.uint32)
+        palette[0] = _argb(r0, g0, b0, 255)
+        palette[1] = _argb(r1, g1, b1, 255)
+        if q0 > q1:
+            palette[2] = _argb(
+                (r0 * 2 + r1) // 3, (g0 * 2 + g1) // 3, (b0 * 2 + b1) // 3, 255
+            )
+            palette[3] = _argb(
+                (r0 + r1 * 2) // 3, (g0 + g1 * 2) // 3, (b0 + b1 * 2) // 3, 255
+            )
+        else:
+            palette[2] = _argb((r0 + r1) // 2, (g0 + g1) // 2, (b0 + b1) // 2, 255)
+            palette[3] = _argb(0, 0, 0, 255)
+        bits = (
+            np.int64(d[4])
+            | np.int64(d[5]) << 8
+            | np.int64(d[6]) << 16
+            | np.int64(d[7]) << 24
+        )
+        for i in range(16):
+            out[i] = palette[bits >> (2 * i) & 3]
+
+    @njit
+    def _bc3_alpha_block(d, out):
+        a0, a1 = np.int64(d[0]), np.int64(d[1])
+        palette = np.empty(8, dtype=np.int64)
+        palette[0], palette[1] = a0, a1
+        if a0 > a1:
+            for i in range(1, 7):
+                palette[i + 1] = (a0 * (7 - i) + a1 * i) // 7
+        else:
+            for i in range(1, 5):
+                palette[i + 1] = (a0 * (5 - i) + a1 * i) // 5
+            palette[6], palette[7] = 0, 255
+        bits = np.int64(0)
+        for b in range(7, 1, -1):
+            bits = bits << 8 | np.int64(d[b])
+        for i in range(16):
+            alpha = palette[bits >> (3 * i) & 7]
+            out[i] = (out[i] & np.uint32(0x00FF_FFFF)) | np.uint32(alpha << 24)
+
+    @njit(parallel=True, cache=True)
+    def decode_etc_rgb(blks, mode):
+        out = np.empty((blks.shape[0], 16), dtype=np.uint32)
+        for n in prange(blks.shape[0]):
+            _etc_rgb_block(blks[n], out[n], mode)
+        return out
+
+    @njit(parallel=True, cache=True)
+    def decode_etc2a8(blks):
+        out = np.empty((blks.shape[0], 16), dtype=np.uint32)
+        for n in prange(blks.shape[0]):
+            _etc_rgb_block(blks[n, 8:], out[n], 0)
+            _etc2_alpha_block(blks[n, :8], out[n])
+        return out
+
+    @njit(parallel=True, cache=True)
+    def decode_dxt1(blks):
+        out = np.empty((blks.shape[0], 16), dtype=np.uint32)
+        for n in prange(blks.shape[0]):
+            _bc1_block(blks[n], out[n])
+        return out
+
+    @njit(parallel=True, cache=True)
+    def decode_dxt5(blks):
+        out = np.empty((blks.shape[0], 16), dtype=np.uint32)
+        for n in prange(blks.shape[0]):
+            _bc1_block(blks[n, 8:], out[n])
+            _bc3_alpha_block(blks[n, :8], out[n])
+        return out
+
+
+def decode_etc2(blks: np.ndarray):
+    return decode_etc_rgb(blks, ETC_MODES["etc2"])
+
+
+def decode_etc1(blks: np.ndarray):
+    return decode_etc_rgb(blks, ETC_MODES["etc1"])
+
+
+def decode_etc2a1(blks: np.ndarray):
+    return decode_etc_rgb(blks, ETC_MODES["etc2a1"])
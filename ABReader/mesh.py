@@ -0,0 +1,41 @@
+import numpy as np
+
+
+class Mesh:
+    """
+    Decoded mesh geometry handed from ABExporter to MeshTexture2D without text round
+    trips.
+
+    Attributes:
+        vertices (np.ndarray): (N, 3) float32 vertex positions.
+        uv (np.ndarray): (N, 2) float32 texture coordinates of the vertices.
+        indices (np.ndarray): (M, 3) int32 vertex indices of the triangles, 0-based.
+    """
+
+    def __init__(
+        self, vertices: np.ndarray, uv: np.ndarray, indices: np.ndarray
+    ) -> None:
+        self.vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        self.uv = np.asarray(uv, dtype=np.float32).reshape(-1, 2)
+        self.indices = np.asarray(indices, dtype=np.int32).reshape(-1, 3)
+
+    def to_obj(self) -> list[str]:
+        """
+        OBJ lines of the mesh (`v`, `vt` and 0-based `f` statements), vertices
+        truncated to integers as Azur Lane paintings use pixel coordinates.
+        """
+        lines = []
+        for v in self.vertices.astype(np.int32):
+            v = [str(x) for x in v]
+            lines.append(f"v {' '.join(v)}")
+        for uv in self.uv:
+            uv = [str(x) for x in uv]
+            lines.append(f"vt {' '.join(uv)}")
+        for i in self.indices:
+            i = [f"{x}/{x}/{x}" for x in i]
+            lines.append(f"f {' '.join(i)}")
+        return lines
+
+    def write_obj(self, path: str):
+        with open(path, "w+") as f:
+            f.writelines(line + "\n" for line in self.to_obj())
@@ -1,6 +1,7 @@
 from ABReader.serialized_file import SerializedFile
 from ABReader.bin_reader import BinaryReader
-from ABReader.utils import int_to_float32, get_bit, bytes_to_float32s
+from ABReader.utils import int_to_float32
+import numpy as np
 
 VERTEX_FMT = [
     "Float",
@@ -16,34 +17,42 @@ VERTEX_FMT = [
     "UInt32",
     "SInt32",
 ]
-VERTEX_FMT_SZ = {
-    4: [
-        "Float",
-        "UInt32",
-        "SInt32",
-    ],
-    2: [
-        "Float16",
-        "UNorm16",
-        "SNorm16",
-        "UInt16",
-        "SInt16",
-    ],
-    1: [
-        "UNorm8",
-        "SNorm8",
-        "UInt8",
-        "SInt8",
-    ],
+VERTEX_DTYPES = {
+    "Float": "<f4",
+    "Float16": "<f2",
+    "UNorm8": "u1",
+    "SNorm8": "i1",
+    "UNorm16": "<u2",
+    "SNorm16": "<i2",
+    "UInt8": "u1",
+    "SInt8": "i1",
+    "UInt16": "<u2",
+    "SInt16": "<i2",
+    "UInt32": "<u4",
+    "SInt32": "<i4",
 }
 
 
 def get_fmt_size(fmt: int):
+    if fmt >= len(VERTEX_FMT):
+        raise ValueError(f"Unknown vertex format: {fmt}")
+    return np.dtype(VERTEX_DTYPES[VERTEX_FMT[fmt]]).itemsize
+
+
+def decode_vertex_components(components: np.ndarray, fmt: int):
+    """
+    Convert raw vertex components of format `fmt` into float32, normalizing UNorm
+    formats to [0, 1] and SNorm formats to [-1, 1] like Unity does.
+    """
     fmt_str = VERTEX_FMT[fmt]
-    for sz, fmts in VERTEX_FMT_SZ.items():
-        if fmt_str in fmts:
-            return sz
-    raise ValueError(f"Unknown vertex format: {fmt}")
+    if fmt_str.startswith("UNorm"):
+        return (components / np.float32(np.iinfo(components.dtype).max)).astype(
+            np.float32
+        )
+    if fmt_str.startswith("SNorm"):
+        components = components / np.float32(np.iinfo(components.dtype).max)
+        return np.maximum(components, -1).astype(np.float32)
+    return components.astype(np.float32)
 
 
 def read_packed_float_vector(reader: BinaryReader):
@@ -52,9 +61,7 @@ def read_packed_float_vector(reader: BinaryReader):
     ret["range"] = int_to_float32(reader.decode_hex(4 * 16, strip=False, reverse=True))
     ret["start"] = int_to_float32(reader.decode_hex(4 * 16, strip=False, reverse=True))
     num_data = reader.decode_hex(4 * 16, strip=False, reverse=True)
-    ret["data"] = []
-    for _ in range(num_data):
-        ret["data"].append(reader.decode_hex(1 * 16, strip=False))
+    ret["data"] = reader.read_array(np.uint8, num_data)
     reader.align()
     ret["bit_size"] = reader.decode_hex(1 * 16, strip=False)
     reader.align()
@@ -65,20 +72,49 @@ def read_packed_int_vector(reader: BinaryReader):
     ret = {}
     ret["num_items"] = reader.decode_hex(4 * 16, strip=False, reverse=True)
     num_data = reader.decode_hex(4 * 16, strip=False, reverse=True)
-    ret["data"] = []
-    for _ in range(num_data):
-        ret["data"].append(reader.decode_hex(1 * 16, strip=False))
+    ret["data"] = reader.read_array(np.uint8, num_data)
     reader.align()
     ret["bit_size"] = reader.decode_hex(1 * 16, strip=False)
     reader.align()
     return ret
 
 
+def unpack_bits(vector: dict, start: int = 0, num_items: int = None):
+    """
+    Extract `num_items` items of `bit_size` bits from a PackedBitVector, starting at item
+    `start`. Items are packed LSB first across bytes, all of them are unpacked at once.
+    """
+    bit_size = vector["bit_size"]
+    num_items = vector["num_items"] - start if num_items is None else num_items
+    data = vector["data"]
+    # (num_data * 8,) stream of bits, least significant bit of each byte first
+    bits = (data[:, np.newaxis] >> np.arange(8, dtype=np.uint8)) & 1
+    bits = bits.reshape(-1)[start * bit_size : (start + num_items) * bit_size]
+    bits = bits.reshape(num_items, bit_size).astype(np.uint32)
+    return (bits << np.arange(bit_size, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+
+def unpack_floats(vector: dict, item_nums_in_chunk: int, start: int = 0, chunk_nums=None):
+    """
+    Unpack a PackedFloatVector into (chunk_nums, item_nums_in_chunk) float32 values,
+    mapping each quantized item back onto [start, start + range].
+    """
+    if chunk_nums is None:
+        chunk_nums = vector["num_items"] // item_nums_in_chunk
+    x = unpack_bits(vector, start, chunk_nums * item_nums_in_chunk)
+    scale = np.float32(1.0) / np.float32(vector["range"])
+    max_val = np.float32((1 << vector["bit_size"]) - 1)
+    floats = x.astype(np.float32) / (scale * max_val) + np.float32(vector["start"])
+    return floats.reshape(chunk_nums, item_nums_in_chunk)
+
+
 class MeshReader:
-    def __init__(self, src: SerializedFile) -> None:
+    def __init__(self, src: SerializedFile, path_id: int = None) -> None:
         self.src = src
+        self.path_id = path_id
         self.reader = self.src.reader
-        print("Mesh name:", self.reader.decode_aligned_str(reverse=True))
+        self.name = self.reader.decode_aligned_str(reverse=True)
+        print("Mesh name:", self.name)
         self.submeshes = self.read_submeshes()
         print("Submeshes:", self.submeshes)
         self.read_shapes_data()
@@ -160,11 +196,11 @@ class MeshReader:
         use_16bit_indices = (
             self.reader.decode_hex(4 * 16, strip=False, reverse=True) == 0
         )
-        assert use_16bit_indices
+        self.idx_dtype = np.dtype(np.uint16 if use_16bit_indices else np.uint32)
         idx_buf_size = self.reader.decode_hex(4 * 16, strip=False, reverse=True)
-        idx_buf = []
-        for _ in range(idx_buf_size // 2):
-            idx_buf.append(self.reader.decode_hex(2 * 16, strip=False, reverse=True))
+        idx_buf = self.reader.read_array(
+            self.idx_dtype, idx_buf_size // self.idx_dtype.itemsize
+        )
         self.reader.align()
         # print(idx_buf[-10:])
         return idx_buf
@@ -184,7 +220,7 @@ class MeshReader:
                 }
             )
         # print(channels)
-        stream_nums = max([chn["stream"] for chn in channels]) + 1
+        stream_nums = max([chn["stream"] for chn in channels], default=-1) + 1
         streams = []
         offset = 0
         for s in range(stream_nums):
@@ -206,9 +242,9 @@ class MeshReader:
             offset += vertex_nums * stride
             offset = (offset + 15) & ~15 & 0xFFFF_FFFF
         # print(streams)
-        data_size = []
-        for _ in range(self.reader.decode_hex(4 * 16, strip=False, reverse=True)):
-            data_size.append(self.reader.decode_hex(1 * 16, strip=False))
+        data_size = self.reader.read_array(
+            np.uint8, self.reader.decode_hex(4 * 16, strip=False, reverse=True)
+        )
         # print(len(data_size), data_size[:50])
         self.reader.align()
         return {
@@ -219,33 +255,21 @@ class MeshReader:
         }
 
     def read_compressed_mesh(self):
-        vertices = read_packed_float_vector(self.reader)
-        uv = read_packed_float_vector(self.reader)
-        normals = read_packed_float_vector(self.reader)
-        tangents = read_packed_float_vector(self.reader)
-        weights = read_packed_int_vector(self.reader)
-        normal_signs = read_packed_int_vector(self.reader)
-        tangent_signs = read_packed_int_vector(self.reader)
-        float_colors = read_packed_float_vector(self.reader)
-        bone_indices = read_packed_int_vector(self.reader)
-        triangles = read_packed_int_vector(self.reader)
-        uv_info = self.reader.decode_hex(4 * 16, strip=False, reverse=True)
-        assert all(
-            i["num_items"] == 0
-            for i in [
-                vertices,
-                uv,
-                normals,
-                tangents,
-                weights,
-                normal_signs,
-                tangent_signs,
-                float_colors,
-                bone_indices,
-                triangles,
-            ]
+        self.compressed_mesh = {
+            "vertices": read_packed_float_vector(self.reader),
+            "uv": read_packed_float_vector(self.reader),
+            "normals": read_packed_float_vector(self.reader),
+            "tangents": read_packed_float_vector(self.reader),
+            "weights": read_packed_int_vector(self.reader),
+            "normal_signs": read_packed_int_vector(self.reader),
+            "tangent_signs": read_packed_int_vector(self.reader),
+            "float_colors": read_packed_float_vector(self.reader),
+            "bone_indices": read_packed_int_vector(self.reader),
+            "triangles": read_packed_int_vector(self.reader),
+        }
+        self.compressed_mesh["uv_info"] = self.reader.decode_hex(
+            4 * 16, strip=False, reverse=True
         )
-        assert uv_info == 0
         self.reader.move(24)
         # m_MeshUsageFlags, m_BakedConvexCollisionMesh, m_BakedTriangleCollisionMesh
         self.reader.move(4 * 3)
@@ -261,48 +285,76 @@ class MeshReader:
     def process_data(self):
         # read vertex data from self.vertex_data
         vertex_nums = self.vertex_data["vertex_nums"]
+        data = self.vertex_data["data_size"]
+        # decoded float32 (vertex_nums, dim) arrays by channel index
+        self.channel_data: dict[int, np.ndarray] = {}
         for i, chn in enumerate(self.vertex_data["channels"]):
-            if chn["dim"] > 0:
-                assert chn["format"] == 0  # float
+            if chn["dim"] > 0 and vertex_nums == 0:
+                # compressed meshes keep their channel layouts but have no vertex data
+                self.channel_data[i] = np.zeros((0, chn["dim"]), dtype=np.float32)
+            elif chn["dim"] > 0:
                 stream = self.vertex_data["streams"][chn["stream"]]
-                if get_bit(stream["channel_mask"], i):
-                    fmt_size = get_fmt_size(chn["format"])
-                component_bytes = [
-                    None for _ in range(vertex_nums * chn["dim"] * fmt_size)
-                ]
-                for v in range(vertex_nums):
-                    vertex_offset = (
-                        stream["offset"] + chn["offset"] + stream["stride"] * v
-                    )
-                    for d in range(chn["dim"]):
-                        component_offset = vertex_offset + d * fmt_size
-                        bytes_offset = fmt_size * (d + v * chn["dim"])
-                        component_bytes[bytes_offset : bytes_offset + fmt_size] = (
-                            self.vertex_data["data_size"][
-                                component_offset : component_offset + fmt_size
-                            ]
+                fmt_size = get_fmt_size(chn["format"])
+                # one strided view over the interleaved stream: (vertex, component)
+                components = np.ndarray(
+                    (vertex_nums, chn["dim"]),
+                    dtype=VERTEX_DTYPES[VERTEX_FMT[chn["format"]]],
+                    buffer=data,
+                    offset=stream["offset"] + chn["offset"],
+                    strides=(stream["stride"], fmt_size),
+                )
+                self.channel_data[i] = decode_vertex_components(
+                    components, chn["format"]
+                )
+        self.decompress_compressed_mesh()
+        # channel 0 holds the positions and channel 4 the first uv set, the others
+        # (normals, tangents, colors, other uv sets) are kept in self.channel_data
+        self.vertices = self.channel_data[0]
+        self.uv0 = self.channel_data[4]
+        print(self.vertices[:10], self.uv0[:10])
+
+    def decompress_compressed_mesh(self):
+        """
+        Decode the vertices, uv sets and triangles of a compressed mesh into
+        `self.channel_data` and `self.idx_buf`, overriding the (empty) vertex data.
+        Normals, tangents, colors and skinning are not needed for paintings and skipped.
+        """
+        cm = self.compressed_mesh
+        vertex_nums = self.vertex_data["vertex_nums"]
+        if cm["vertices"]["num_items"] > 0:
+            vertex_nums = cm["vertices"]["num_items"] // 3
+            self.channel_data[0] = unpack_floats(cm["vertices"], 3)
+        if cm["uv"]["num_items"] > 0:
+            uv_info = cm["uv_info"]
+            if uv_info != 0:
+                # 4 bits per uv set: bit 2 tells the set exists, bits 0-1 its dimension - 1
+                uv_start = 0
+                for uv in range(8):
+                    bits = uv_info >> (uv * 4) & 0xF
+                    if bits & 4:
+                        uv_dim = 1 + (bits & 3)
+                        self.channel_data[4 + uv] = unpack_floats(
+                            cm["uv"], uv_dim, uv_start, vertex_nums
                         )
-                component_floats = bytes_to_float32s(component_bytes)
-                if i == 0:
-                    self.vertices = component_floats
-                elif i == 4:
-                    self.uv0 = component_floats
-                else:
-                    raise ValueError(
-                        f"Channels other than 0 & 4 (got {i}) should have dim=0"
+                        uv_start += uv_dim * vertex_nums
+            else:
+                self.channel_data[4] = unpack_floats(cm["uv"], 2, 0, vertex_nums)
+                if cm["uv"]["num_items"] >= vertex_nums * 4:
+                    self.channel_data[5] = unpack_floats(
+                        cm["uv"], 2, vertex_nums * 2, vertex_nums
                     )
-        print(self.vertices[:10], self.uv0[:10])
-        # at here, we jump all of DecompressCompressedMesh for assertions of empty compressed mesh in self.read_compressed_mesh
+        if cm["triangles"]["num_items"] > 0:
+            self.idx_buf = unpack_bits(cm["triangles"]).astype(self.idx_dtype)
 
     def get_triangles(self):
-        self.indices = []
-        for sm in self.submeshes:
-            first_idx = sm["first_byte"] // 2
-            # we use 16 bit indices as asserted before (self.read_idx_buf)
-            index_nums = sm["index_nums"]
-            # we use triangle topology as asserted before (self.read_submeshes)
-            # top = sm["topology"]
-            for i in range(0, index_nums, 3):
-                self.indices.append(self.idx_buf[first_idx + i])
-                self.indices.append(self.idx_buf[first_idx + i + 1])
-                self.indices.append(self.idx_buf[first_idx + i + 2])
+        # we use triangle topology as asserted before (self.read_submeshes)
+        idx_size = self.idx_dtype.itemsize
+        self.indices = np.concatenate(
+            [
+                self.idx_buf[
+                    sm["first_byte"] // idx_size : sm["first_byte"] // idx_size
+                    + sm["index_nums"]
+                ]
+                for sm in self.submeshes
+            ]
+        ).astype(np.int32)
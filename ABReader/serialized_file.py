@@ -53,7 +53,7 @@ class SerializedFile:
                     self.reader.decode_hex(2 * 16, strip=False)
                 )
             if v >= 13:
-                t["old_type_hash"] = self.reader.read(16, strip=False)
+                t["old_type_hash"] = self.reader.read(16, strip=False).tobytes()
             if enable_typetree:
                 if v >= 12:
                     t["nodes"] = self.read_typetree()
@@ -103,8 +103,7 @@ class SerializedFile:
                 )
             nodes.append(node)
         string_buf = self.reader.read(str_bufsize)
-        # print(self.reader.hexes[self.reader.ptr:self.reader.ptr+10])
-        string_buf_reader = BinaryReader(bytes.fromhex("".join(string_buf)))
+        string_buf_reader = BinaryReader(string_buf)
         for i in range(node_nums):
             node = nodes[i]
             nodes[i]["type"] = SerializedFile.read_str(
@@ -153,7 +152,6 @@ class SerializedFile:
                 obj["ser_type"] = obj_type
                 obj["class_id"] = obj_type["class_id"]
             objs.append(obj)
-        # print("".join(self.reader.hexes[self.reader.ptr:self.reader.ptr+20]))
         script_types = []
         if v >= 11:
             script_nums = uint_to_int(
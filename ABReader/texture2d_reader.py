@@ -5,10 +5,12 @@ IMG_TYPES = json.load(open("ABReader/image_types.json"))
 
 
 class Texture2DReader:
-    def __init__(self, src: SerializedFile) -> None:
+    def __init__(self, src: SerializedFile, path_id: int = None) -> None:
         self.src = src
+        self.path_id = path_id
         self.reader = self.src.reader
-        print("Texture 2D name:", self.reader.decode_aligned_str(reverse=True))
+        self.name = self.reader.decode_aligned_str(reverse=True)
+        print("Texture 2D name:", self.name)
         # readInt32, readBoolean * 2, alignStream
         self.reader.move(4 + 1 * 2).align(4)
         (
@@ -63,11 +65,8 @@ class Texture2DReader:
             4 * 16, strip=False, reverse=True
         )
         strlen = self.reader.decode_hex(4 * 16, strip=False, reverse=True)
-        streaming_info["path"] = bytes.fromhex(
-            "".join(self.reader.read(strlen, strip=False))
-        ).decode()
+        streaming_info["path"] = self.reader.read(strlen, strip=False).tobytes().decode()
         self.reader.align(4)
-        # print(self.reader.hexes[self.reader.ptr:self.reader.ptr + 10])
         return streaming_info
 
     def get_image_data(self):
@@ -0,0 +1,128 @@
+from ABReader.block_decomp import BlockDecoder
+from ABReader.etc2_decomp import ETC1Decoder, ETC2Decoder, ETC2A1Decoder, ETC2A8Decoder
+from ABReader.bcn_decomp import DXT1Decoder, DXT5Decoder
+from typing import Callable
+import re
+import numpy as np
+
+TextureDecoder = Callable[[np.ndarray, int, int], np.ndarray]
+# blocks decoded at once by default, bounding the decoding temporaries for any texture size
+CHUNK_BLOCKS = 1 << 15
+
+
+def argb32_to_rgba(img: np.ndarray, width: int, height: int):
+    """
+    Reinterpret the (width * height) ARGB32 `img` as a (height, width, 4) RGBA view,
+    swapping the R and B bytes of each word in place instead of copying the image.
+    """
+    # ARGB32 words are BGRA bytes in little endian, we turn them into RGBA (0, 1, 2, 3 -> 2, 1, 0, 3)
+    # slice by slice, the temporaries stay bounded like the chunked block decoding
+    step = CHUNK_BLOCKS * 16
+    for i in range(0, len(img), step):
+        words = img[i : i + step]
+        rb = words & 0x00FF_00FF
+        words &= 0xFF00_FF00
+        words |= (rb << 16) | (rb >> 16)
+    return img.view(np.uint8).reshape((height, width, 4))
+
+
+def decode_blocks(
+    decoder: type[BlockDecoder],
+    data: np.ndarray,
+    width: int,
+    height: int,
+    chunk_rows: int = None,
+):
+    """
+    Decode a block-compressed payload chunk by chunk of `chunk_rows` block rows, as many as
+    fit in CHUNK_BLOCKS blocks when None.
+    """
+    blk_decoder = decoder(data, width, height)
+    if chunk_rows is None:
+        chunk_rows = max(1, CHUNK_BLOCKS // blk_decoder.num_blks_x)
+    return argb32_to_rgba(blk_decoder.decode(chunk_rows), width, height)
+
+
+def pixel_decoder(channels: int, order: list[int]) -> TextureDecoder:
+    """
+    Decoder of uncompressed 8-bit formats, `order` picks the R, G, B, A channels of a pixel.
+    """
+
+    def decode(data: np.ndarray, width: int, height: int):
+        assert width * height * channels <= len(data)
+        img = data[: width * height * channels].reshape((height, width, channels))
+        # the payload already is RGBA, hand out a view
+        return img if order == list(range(channels)) else img[..., order]
+
+    return decode
+
+
+def decode_rgb24(data: np.ndarray, width: int, height: int):
+    img = np.full((height, width, 4), 255, dtype=np.uint8)
+    img[..., :3] = data[: width * height * 3].reshape((height, width, 3))
+    return img
+
+
+def decode_alpha8(data: np.ndarray, width: int, height: int):
+    img = np.full((height, width, 4), 255, dtype=np.uint8)
+    img[..., 3] = data[: width * height].reshape((height, width))
+    return img
+
+
+def decode_rgba4444(data: np.ndarray, width: int, height: int):
+    pixels = data[: width * height * 2].view("<u2").reshape((height, width, 1))
+    # 0xRGBA nibbles, each expanded to 8 bits
+    img = (pixels >> np.array([12, 8, 4, 0], dtype=np.uint16) & 0xF).astype(np.uint8)
+    return img << 4 | img
+
+
+def decode_astc(data: np.ndarray, width: int, height: int, blk_w: int, blk_h: int):
+    try:
+        import texture2ddecoder
+    except ImportError as e:
+        raise NotImplementedError(
+            "ASTC textures are decoded with the optional texture2ddecoder package"
+        ) from e
+    img = texture2ddecoder.decode_astc(data.tobytes(), width, height, blk_w, blk_h)
+    return argb32_to_rgba(np.frombuffer(img, dtype=np.uint32).copy(), width, height)
+
+
+TEXTURE_DECODERS: dict[str, TextureDecoder] = {
+    "RGBA32": pixel_decoder(4, [0, 1, 2, 3]),
+    "ARGB32": pixel_decoder(4, [1, 2, 3, 0]),
+    "BGRA32": pixel_decoder(4, [2, 1, 0, 3]),
+    "RGB24": decode_rgb24,
+    "Alpha8": decode_alpha8,
+    "RGBA4444": decode_rgba4444,
+}
+
+BLOCK_DECODERS: dict[str, type[BlockDecoder]] = {
+    "ETC_RGB4": ETC1Decoder,
+    "ETC2_RGB": ETC2Decoder,
+    "ETC2_RGBA1": ETC2A1Decoder,
+    "ETC2_RGBA8": ETC2A8Decoder,
+    "DXT1": DXT1Decoder,
+    "DXT5": DXT5Decoder,
+}
+
+
+def decode_texture(
+    data: np.ndarray, width: int, height: int, fmt: str, chunk_rows: int = None
+):
+    """
+    Decode a texture payload of format `fmt` (see image_types.json) into a (height, width, 4)
+    RGBA array, rows kept in the stored (bottom-up) order. The array may be a view of `data`
+    or of the decoder's buffer rather than a fresh copy.
+
+    Args:
+        chunk_rows (int): Block rows of block-compressed formats decoded at once. Default is
+        None, as many as fit in CHUNK_BLOCKS blocks.
+    """
+    if fmt in BLOCK_DECODERS:
+        return decode_blocks(BLOCK_DECODERS[fmt], data, width, height, chunk_rows)
+    if fmt in TEXTURE_DECODERS:
+        return TEXTURE_DECODERS[fmt](data, width, height)
+    astc = re.match(r"^ASTC_RGBA?_(\d+)x(\d+)$", fmt)
+    if astc:
+        return decode_astc(data, width, height, int(astc[1]), int(astc[2]))
+    raise NotImplementedError(f"Unsupported texture format: {fmt}")
@@ -10,13 +10,26 @@ from ImageDecoders.alpha_blend import alpha_blend_torch, alpha_blend
 from tqdm import tqdm
 
 
+# per-channel mse floor of psnr, so that a channel matching everywhere (e.g. a binary head
+# alpha) gives a finite psnr instead of inf in every window
+MSE_FLOOR = 1e-10
+
+
+def psnr_of_mse(mse: torch.Tensor, dim: int = -1):
+    """
+    PSNR averaged over the channel dimension `dim` of per-channel mse values.
+    """
+    I = 255.0
+    mse = torch.clamp(mse, min=MSE_FLOOR)
+    return torch.mean(20 * torch.log10(I / torch.sqrt(mse)), dim=dim)
+
+
 def psnr(a: torch.tensor, b: torch.tensor):
     """
     Calculate PSNR index between 2 BCHW shaped tensor images.
     """
-    I = 255.0
     mse = torch.mean((a - b) ** 2, dim=(-2, -1))  # (B, C)
-    return torch.mean(20 * torch.log10(I / torch.sqrt(mse)), dim=-1)  # B
+    return psnr_of_mse(mse)  # B
 
 
 def mse(a: torch.tensor, b: torch.tensor):
@@ -54,11 +67,13 @@ def ssim(
     return torch.abs(ssim) if abs else ssim
 
 
-def image_to_tensor(image: Image.Image, device="cpu"):
+def image_to_tensor(image: Image.Image | np.ndarray, device="cpu"):
     """
     Reshapes the image to (B, C, H, W) tensor.
     """
-    t = torch.tensor(np.array(image)).permute(2, 0, 1).float() / 255.0  # (C, H, W)
+    # copy, PIL images and cached arrays are read-only
+    t = torch.as_tensor(np.array(image))
+    t = t.permute(2, 0, 1).float() / 255.0  # (C, H, W)
     return t.reshape(1, *t.shape).to(device)  # (B, C, H, W)
 
 
@@ -71,34 +86,232 @@ def show_tensor(image: torch.Tensor):
     img.show()
 
 
+# memory budget of the windows CustomConv2d unfolds at once
+WINDOW_BYTES = 256 << 20
+# live copies of the windows while scoring a chunk (unfolded, blended, metric temporaries)
+WINDOW_COPIES = 4
+
+
+def argmax2d(k: torch.Tensor):
+    """
+    Best score of a (H, W) score map and its (row, col) location, as tensors.
+    """
+    best_loc = torch.argmax(k)
+    return k.reshape(-1)[best_loc], best_loc // k.shape[-1], best_loc % k.shape[-1]
+
+
 class CustomConv2d(torch.nn.Module):
+    """
+    Sliding-window evaluation of an arbitrary metric between the alpha-blended image windows
+    and the kernel. Windows are unfolded in chunks of output rows (or of columns of a single
+    row for huge kernels) so that at most `max_bytes` of windows are alive at once.
+
+    The metric takes (N, C, Hk, Wk) blended windows and the broadcast kernel, and returns
+    (N,) scores, higher is better. Per-channel (N, C) scores, like mse, are errors: they are
+    averaged over the channels and negated.
+    """
+
     def __init__(
         self,
         kernel: torch.Tensor,
         metric: Callable[[torch.Tensor, torch.Tensor], torch.Tensor] = psnr,
+        max_bytes: int = WINDOW_BYTES,
     ):
         super(CustomConv2d, self).__init__()
         self.kernel = kernel
         self.metric = metric
+        self.max_bytes = max_bytes
+
+    def chunks(self, H_out: int, W_out: int):
+        """
+        Yield the (r0, r1, c0, c1) output ranges of the chunks in row-major order.
+        """
+        window_bytes = self.kernel[0].numel() * self.kernel.element_size() * WINDOW_COPIES
+        num = max(1, self.max_bytes // window_bytes)
+        if num >= W_out:
+            rows = num // W_out
+            for r0 in range(0, H_out, rows):
+                yield r0, min(r0 + rows, H_out), 0, W_out
+        else:
+            for r0 in range(H_out):
+                for c0 in range(0, W_out, num):
+                    yield r0, r0 + 1, c0, min(c0 + num, W_out)
+
+    def scores(self, x: torch.Tensor):
+        """
+        Yield the (r0, c0, scores) of each chunk, scores being (r1 - r0, c1 - c0).
+        """
+        C, H_k, W_k = self.kernel.shape[1:]
+        H, W = x.shape[-2:]
+        kernel = self.kernel.reshape((1, C, H_k, W_k))
+        for r0, r1, c0, c1 in self.chunks(H - H_k + 1, W - W_k + 1):
+            # windows shape after unfold: (1, C*H_k*W_k, num_entries)
+            windows = (
+                F.unfold(x[:, :, r0 : r1 + H_k - 1, c0 : c1 + W_k - 1], (H_k, W_k))
+                .reshape((C, H_k, W_k, -1))
+                .permute((3, 0, 1, 2))
+            )  # (num_entries, C, Hk, Wk) (BCHW-like)
+            kernels = kernel.expand(windows.shape)
+            # apply the alpha channel on the kernel to the image
+            x_blended = alpha_blend_torch(windows, kernels, kernels[:, 3:, :, :])
+            score = self.metric(x_blended, kernels)
+            if score.ndim > 1:
+                score = -torch.mean(score, dim=-1)
+            yield r0, c0, score.reshape((r1 - r0, c1 - c0))
 
     def forward(self, x: torch.Tensor):
         C, H_k, W_k = self.kernel.shape[1:]
         H, W = x.shape[-2:]
-        # x shape after unfold: (1, C*H_k*W_k, num_entries)
-        x = (
-            F.unfold(x, (H_k, W_k))
-            .clone()
-            .reshape((C, H_k, W_k, -1))
-            .permute((3, 0, 1, 2))
-        )  # (num_entries, C, Hk, Wk) (BCHW-like)
-        kernel = (
-            self.kernel.reshape((C, H_k, W_k, 1))
-            .repeat(1, 1, 1, x.shape[0])
-            .permute((3, 0, 1, 2))
-        )
-        # apply the alpha channel on the kernel to the image
-        x_blended = alpha_blend_torch(x, kernel, kernel[:, 3:, :, :])
-        return self.metric(x_blended, kernel).reshape((H - H_k + 1, W - W_k + 1))
+        out = torch.empty((H - H_k + 1, W - W_k + 1), device=x.device)
+        for r0, c0, score in self.scores(x):
+            out[r0 : r0 + score.shape[0], c0 : c0 + score.shape[1]] = score
+        return out
+
+    def best(self, x: torch.Tensor):
+        """
+        Running argmax over the chunks, keeping only the best score and its (row, col)
+        location. Ties resolve to the first location like torch.argmax.
+        """
+        best = None
+        for r0, c0, score in self.scores(x):
+            s, r, c = argmax2d(score)
+            if best is None or s > best[0]:
+                best = (s, r + r0, c + c0)
+        return best
+
+
+# kernels of at least this many pixels are correlated through FFT instead of F.conv2d
+FFT_KERNEL_PIXELS = 32 * 32
+# pixels re-checked around a shared head placement, see Heading.place_heads
+REFINE_RADIUS = 2
+
+
+def correlate(x: torch.Tensor, w: torch.Tensor, fft: bool = False):
+    """
+    Valid per-channel cross-correlation of a (1, C, H, W) image with a batch of (B, C, Hk, Wk)
+    kernels, returning (B, C, H - Hk + 1, W - Wk + 1).
+    """
+    B, C, Hk, Wk = w.shape
+    H, W = x.shape[-2:]
+    if not fft:
+        # group c correlates image channel c with channel c of every kernel
+        w = w.transpose(0, 1).reshape(C * B, 1, Hk, Wk)
+        out = F.conv2d(x, w, groups=C)  # (1, C * B, H', W')
+        return out.reshape(C, B, H - Hk + 1, W - Wk + 1).transpose(0, 1)
+    # circular correlation, the valid part never wraps around
+    X = torch.fft.rfft2(x, s=(H, W))
+    K = torch.fft.rfft2(w, s=(H, W))
+    return torch.fft.irfft2(X * K.conj(), s=(H, W))[..., : H - Hk + 1, : W - Wk + 1]
+
+
+class CrossCorrConv2d(torch.nn.Module):
+    """
+    Drop-in replacement of CustomConv2d for the psnr, mse and ssim metrics (plain or wrapped
+    in functools.partial) that never materialises the windows.
+
+    In every window the image x is blended under the kernel alpha a, b = a * x + (1 - a) * k,
+    and compared with the kernel k. Every statistic the metrics need (sums of b, b^2 and
+    b * k) expands into sums of x and x^2 weighted by kernel-only masks, i.e. a few
+    cross-correlations computed with F.conv2d, or FFT for large kernels. Memory is O(image).
+    Scores match CustomConv2d up to rounding.
+
+    The kernel may hold a batch of B equally sized heads, scored together in one pass.
+    """
+
+    def __init__(
+        self,
+        kernel: torch.Tensor,
+        metric: Callable[[torch.Tensor, torch.Tensor], torch.Tensor] = psnr,
+        fft: bool = None,
+        dtype: torch.dtype = torch.float64,
+    ):
+        """
+        Args:
+            kernel (torch.Tensor): (B, C, Hk, Wk) heads.
+            fft (bool): Correlate through FFT. Default is None, using FFT for kernels of at
+            least FFT_KERNEL_PIXELS pixels.
+            dtype (torch.dtype): Accumulation dtype, float64 keeps the sums of squares from
+            cancelling out. Default is torch.float64.
+        """
+        super(CrossCorrConv2d, self).__init__()
+        self.metric, self.metric_kwargs = self.resolve_metric(metric)
+        assert self.metric is not None, "Unsupported metric, use CustomConv2d"
+        self.kernel = kernel.to(dtype)
+        self.dtype = dtype
+        H_k, W_k = kernel.shape[-2:]
+        self.fft = H_k * W_k >= FFT_KERNEL_PIXELS if fft is None else fft
+
+    @staticmethod
+    def resolve_metric(metric: Callable):
+        kwargs = {}
+        if isinstance(metric, partial) and not metric.args:
+            metric, kwargs = metric.func, dict(metric.keywords)
+        if metric in (psnr, mse, ssim):
+            return metric, kwargs
+        return None, None
+
+    @staticmethod
+    def supports(metric: Callable):
+        return CrossCorrConv2d.resolve_metric(metric)[0] is not None
+
+    def best(self, x: torch.Tensor):
+        return argmax2d(self(x))
+
+    def best_batch(self, x: torch.Tensor):
+        """
+        Best (scores, rows, cols) of each kernel of the batch, (B,) tensors each.
+        """
+        k = self.scores(x)
+        best_loc = torch.argmax(k.reshape(len(k), -1), dim=-1)
+        score = k.reshape(len(k), -1)[torch.arange(len(k)), best_loc]
+        return score, best_loc // k.shape[-1], best_loc % k.shape[-1]
+
+    def forward(self, x: torch.Tensor):
+        """
+        (H', W') scores of a single kernel, (B, H', W') of a batch.
+        """
+        k = self.scores(x)
+        return k[0] if len(k) == 1 else k
+
+    def scores(self, x: torch.Tensor):
+        """
+        (B, H', W') scores of every kernel of the batch.
+        """
+        B, C, H_k, W_k = self.kernel.shape
+        n = H_k * W_k
+        x = x.to(self.dtype)
+        k = self.kernel
+        a = k[:, 3:4]  # kernel alpha, (B, 1, Hk, Wk)
+
+        def corr(img: torch.Tensor, w: torch.Tensor):
+            return correlate(img, w.expand(B, C, H_k, W_k), self.fft)  # (B, C, H', W')
+
+        def total(w: torch.Tensor):
+            return torch.sum(w, dim=(-2, -1))[..., None, None]  # (B, C, 1, 1)
+
+        if self.metric is not ssim:
+            # mean((b - k)^2) = mean(a^2 (x - k)^2)
+            sq_err = corr(x * x, a * a) - 2 * corr(x, a * a * k) + total(a * a * k * k)
+            mse_c = torch.clamp(sq_err / n, min=0)  # (B, C, H', W')
+            if self.metric is mse:
+                return -torch.mean(mse_c, dim=1)
+            return psnr_of_mse(mse_c, dim=1)
+        # global ssim statistics of b and k in every window
+        kc = (1 - a) * k
+        mu_b = (corr(x, a) + total(kc)) / n
+        mu_k = total(k) / n
+        sum_bb = corr(x * x, a * a) + 2 * corr(x, a * kc) + total(kc * kc)
+        sum_bk = corr(x, a * k) + total(kc * k)
+        sigma_b = torch.sqrt(torch.clamp((sum_bb - n * mu_b**2) / (n - 1), min=0))
+        sigma_k = torch.std(k, dim=(-2, -1))[..., None, None]
+        sigma_bk = (sum_bk - n * mu_b * mu_k) / (n - 1)
+        alpha, beta, gamma = self.metric_kwargs.get("exps", (1.0, 1.0, 1.0))
+        c1, c2, c3 = self.metric_kwargs.get("consts", (0.01, 0.03, 0.015))
+        l = (2 * mu_b * mu_k + c1) / (mu_b**2 + mu_k**2 + c1)
+        c = (2 * sigma_b * sigma_k + c2) / (sigma_b**2 + sigma_k**2 + c2)
+        s = (sigma_bk + c3) / (sigma_b * sigma_k + c3)
+        score = torch.mean((l**alpha) * (c**beta) * (s**gamma), dim=1)
+        return torch.abs(score) if self.metric_kwargs.get("abs", False) else score
 
 
 class Heading:
@@ -107,21 +320,23 @@ class Heading:
 
     Attributes:
         src_path (str): Path to the source image.
-        picture (Image.Image): Loaded source image.
-        heads (list[Image.Image]): List of head images to be used for replacement.
-        ref_head (Image.Image): Reference head image set dynamically w.r.t currently processing image. This image is both used in
+        picture (Image.Image | np.ndarray): Loaded source image, RGBA arrays (e.g. from
+        `ABExporter.export(as_array=True)`) are used as is.
+        heads (list[Image.Image | np.ndarray]): List of head images to be used for replacement.
+        ref_head (Image.Image | np.ndarray): Reference head image set dynamically w.r.t currently processing image. This image is both used in
         comparing with original images in sliding 2d windows in FPN, and the alpha channel masking in final replacement.
         device (str): Device to run computations on, either 'cuda' or 'cpu'. If cuda is available, it will be automatically set.
+        pyramid (dict[int, torch.Tensor]): Downsample rate -> source image tensor on the device, built once and shared by every head.
     """
 
     def __init__(
         self,
         src_path: str = None,
         heads_path: str = None,
-        src: Image.Image = None,
-        heads: list[Image.Image] = None,
+        src: Image.Image | np.ndarray = None,
+        heads: list[Image.Image | np.ndarray] = None,
     ) -> None:
-        self.picture = src if src else Image.open(src_path)
+        self.picture = src if src is not None else Image.open(src_path)
         if heads_path:
             heads_path = [os.path.join(heads_path, p) for p in os.listdir(heads_path)]
             self.heads = [Image.open(h) for h in heads_path]
@@ -129,100 +344,235 @@ class Heading:
             self.heads = heads
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         # self.device = "cpu"
+        self.pyramid: dict[int, torch.Tensor] = {}
 
-    def _downsample(self, factor: int, ref_head: Image.Image):
+    def _downsample(self, factor: int, image: Image.Image | np.ndarray):
         if factor == 1:
-            return self.picture, ref_head
-        return self.picture.resize(
-            (self.picture.size[0] // factor, self.picture.size[1] // factor),
-            Image.Resampling.BICUBIC,
-        ), ref_head.resize(
-            (ref_head.size[0] // factor, ref_head.size[1] // factor),
+            return image
+        w, h = image_size(image)
+        return to_image(image).resize(
+            (w // factor, h // factor),
             Image.Resampling.BICUBIC,
         )
 
+    def source(self, rate: int):
+        """
+        Source image downsampled by `rate` as a (1, C, H, W) device tensor, cached in the pyramid.
+        """
+        if rate not in self.pyramid:
+            self.pyramid[rate] = image_to_tensor(
+                self._downsample(rate, self.picture), self.device
+            )
+        return self.pyramid[rate]
+
     def static_fpn(
         self,
-        ref_head: Image.Image,
+        ref_head: Image.Image | np.ndarray,
         layers=4,
         factor=2,
         optim_range: list[int] = None,
         metric=psnr,
+        engine: str = "xcorr",
+        max_bytes: int = WINDOW_BYTES,
     ):
         """
         Perform static Feature Pyramid Network (FPN) to locate the best match of the reference head in the source image.
 
         Args:
-            layers (int): Number of downsample layers. Default is 4.
+            layers (int): Number of downsample layers. Default is 4. With the xcorr engine,
+            layers=1 searches the full resolution image directly.
             factor (int): Downsample factor. Default is 2.
             optim_range (list[int]): List of optimization ranges for each layer. Default is None,
             automatically decided by layers and factor.
             metric (Callable): Metric to evaluate the match quality. Default is psnr.
+            engine (str): "xcorr" scores through CrossCorrConv2d, falling back to "unfold"
+            (CustomConv2d) for metrics it does not support. Default is "xcorr".
+            max_bytes (int): Memory budget of the windows unfolded at once by the unfold
+            engine. Default is WINDOW_BYTES.
 
         Returns:
             tuple[int, int]: Coordinates (x, y) of the best match location.
         """
+        return self.match_heads(
+            [ref_head], layers, factor, optim_range, metric, engine, max_bytes
+        )[0]
+
+    def match_heads(
+        self,
+        ref_heads: list[Image.Image | np.ndarray],
+        layers=4,
+        factor=2,
+        optim_range: list[int] = None,
+        metric=psnr,
+        engine: str = "xcorr",
+        max_bytes: int = WINDOW_BYTES,
+    ):
+        """
+        Batched static_fpn over several heads, taking the same arguments. The source pyramid is
+        built once, and heads of equal size are searched together over the whole coarsest layer
+        (in one CrossCorrConv2d batch with the xcorr engine). The narrowed finer layers are then
+        refined head by head.
+
+        Returns:
+            list[tuple[int, int]]: Coordinates (x, y) of the best match location of each head.
+        """
+        Conv = self._conv(metric, engine, max_bytes)
+        use_xcorr = Conv is CrossCorrConv2d
         downsample_rates = [factor**i for i in range(layers)]
         downsample_rates = list(reversed(downsample_rates))
         if not optim_range:
             optim_range = downsample_rates[:-1]
-        x: int = None
-        y: int = None
-        bx1: int = None
-        by1: int = None
-        for i, rate in enumerate(downsample_rates):
-            src, head = self._downsample(rate, ref_head)
-            src, head = image_to_tensor(src, self.device), image_to_tensor(
-                head, self.device
-            )
-            print(f"Downsample rate x{rate}")
-            print(f"Src image size {src.size()}, head size {head.size()}")
-            if (
-                x != None and y != None
-            ):  # we narrow down the search range layer by layer
-                o = optim_range[i - 1]  # the first loop does not apply
-                bx1, by1 = (x - o) * factor, (y - o) * factor
-                bx2, by2 = (x + o) * factor, (y + o) * factor
-                bx1, bx2 = torch.clamp(
-                    bx1, 0, src.shape[-2] - head.shape[-2]
-                ), torch.clamp(bx2, 0, src.shape[-2] - head.shape[-2])
-                by1, by2 = torch.clamp(
-                    by1, 0, src.shape[-1] - head.shape[-1]
-                ), torch.clamp(by2, 0, src.shape[-1] - head.shape[-1])
-                src = src[:, :, bx1 : bx2 + head.shape[-2], by1 : by2 + head.shape[-1]]
-            # show_tensor(src)
-            # show_tensor(head)
-            # evaluate by convolution
-            k: torch.Tensor = CustomConv2d(head, metric=metric)(src)
-            # find the best location
-            best_loc = torch.argmax(k)
-            x, y = best_loc // k.shape[-1], best_loc % k.shape[-1]
-            if bx1 != None and by1 != None:  # add bias
-                x += bx1
-                y += by1
-            print(
-                f"Best match score: {torch.max(k)}, location: {x.detach().cpu().numpy()}, {y.detach().cpu().numpy()}"
-            )
+        groups: dict[tuple[int, int], list[int]] = {}
+        for j, ref_head in enumerate(ref_heads):
+            groups.setdefault(image_size(ref_head), []).append(j)
+        locations = [None] * len(ref_heads)
+        for idxs in groups.values():
+            x: torch.Tensor = None
+            y: torch.Tensor = None
+            for i, rate in enumerate(downsample_rates):
+                src = self.source(rate)
+                heads = torch.cat(
+                    [
+                        image_to_tensor(self._downsample(rate, ref_heads[j]), self.device)
+                        for j in idxs
+                    ]
+                )  # (B, C, H, W)
+                print(f"Downsample rate x{rate}")
+                print(f"Src image size {src.size()}, head size {heads.size()}")
+                if x is None and use_xcorr:  # evaluate the whole image by convolution
+                    score, x, y = Conv(heads, metric=metric).best_batch(src)
+                elif x is None:
+                    best = [
+                        Conv(heads[b : b + 1], metric=metric).best(src)
+                        for b in range(len(idxs))
+                    ]
+                    score, x, y = (torch.stack(t) for t in zip(*best))
+                else:  # we narrow down the search range layer by layer
+                    o = optim_range[i - 1]  # the first loop does not apply
+                    best = []
+                    for b in range(len(idxs)):
+                        best.append(
+                            self._search_window(
+                                Conv(heads[b : b + 1], metric=metric),
+                                src,
+                                ((x[b] - o) * factor, (x[b] + o) * factor),
+                                ((y[b] - o) * factor, (y[b] + o) * factor),
+                            )
+                        )
+                    score, x, y = (torch.stack(t) for t in zip(*best))
+                print(
+                    f"Best match score: {score.detach().cpu().numpy()}, location: {x.detach().cpu().numpy()}, {y.detach().cpu().numpy()}"
+                )
+            for b, j in enumerate(idxs):
+                locations[j] = x[b].detach().cpu().numpy(), y[b].detach().cpu().numpy()
+        return locations
+
+    def place_heads(self, ref_idx: int = 0, radius: int = REFINE_RADIUS, **fpn_kwargs):
+        """
+        Locate every head from a single search. Heads of the same size as the reference head
+        (e.g. the expressions of a paintingface bundle, which share their anchor) reuse its
+        static_fpn location and only re-check the top-left corners within `radius` pixels of
+        it. Heads of other sizes go through match_heads.
+
+        Args:
+            ref_idx (int): Index of the reference head. Default is 0.
+            radius (int): Radius of the refinement window, 0 reuses the reference location
+            as is. Default is REFINE_RADIUS.
+            **fpn_kwargs: Keyword arguments for the static_fpn method.
+
+        Returns:
+            list[tuple[int, int]]: Coordinates (x, y) of each head.
+        """
+        ref_head = self.heads[ref_idx]
+        x, y = self.static_fpn(ref_head, **fpn_kwargs)
+        siblings = [
+            i for i, h in enumerate(self.heads) if image_size(h) == image_size(ref_head)
+        ]
+        others = [i for i in range(len(self.heads)) if i not in siblings]
+        locations = [None] * len(self.heads)
+        for i, loc in zip(
+            others, self.match_heads([self.heads[i] for i in others], **fpn_kwargs)
+        ):
+            locations[i] = loc
+        refine_kwargs = {
+            k: v for k, v in fpn_kwargs.items() if k in ("metric", "engine", "max_bytes")
+        }
+        for i in siblings:
+            if i == ref_idx or radius == 0:
+                locations[i] = x, y
+            else:
+                locations[i] = self.refine_head(
+                    self.heads[i], x, y, radius, **refine_kwargs
+                )
+        return locations
+
+    def refine_head(
+        self,
+        ref_head: Image.Image | np.ndarray,
+        x: int,
+        y: int,
+        radius: int = REFINE_RADIUS,
+        metric=psnr,
+        engine: str = "xcorr",
+        max_bytes: int = WINDOW_BYTES,
+    ):
+        """
+        Best full resolution location of `ref_head` among the top-left corners within
+        `radius` pixels of (x, y).
+
+        Returns:
+            tuple[int, int]: Coordinates (x, y) of the best match location.
+        """
+        Conv = self._conv(metric, engine, max_bytes)
+        conv = Conv(image_to_tensor(ref_head, self.device), metric=metric)
+        _, x, y = self._search_window(
+            conv, self.source(1), (x - radius, x + radius), (y - radius, y + radius)
+        )
         return x.detach().cpu().numpy(), y.detach().cpu().numpy()
 
+    @staticmethod
+    def _conv(metric: Callable, engine: str, max_bytes: int):
+        if engine == "xcorr" and CrossCorrConv2d.supports(metric):
+            return CrossCorrConv2d
+        return partial(CustomConv2d, max_bytes=max_bytes)
+
+    @staticmethod
+    def _search_window(
+        conv: torch.nn.Module,
+        src: torch.Tensor,
+        x_range: tuple[int, int],
+        y_range: tuple[int, int],
+    ):
+        """
+        Best (score, x, y) of `conv` among the top-left corners in the inclusive ranges,
+        clamped to the source image.
+        """
+        H_k, W_k = conv.kernel.shape[-2:]
+        x1, x2 = (int(max(0, min(v, src.shape[-2] - H_k))) for v in x_range)
+        y1, y2 = (int(max(0, min(v, src.shape[-1] - W_k))) for v in y_range)
+        score, x, y = conv.best(src[:, :, x1 : x2 + H_k, y1 : y2 + W_k])
+        return score, x + x1, y + y1  # add bias
+
     def replace_heads(self, out_path: str = None, **fpn_kwargs):
         """
         Replace the head in the source image with the best-matched head from the head list.
+        All heads are matched together through match_heads.
 
         Args:
             out_path (str): Path to save the output images.
-            **fpn_kwargs: Keyword arguments for the static_fpn method.
+            **fpn_kwargs: Keyword arguments for the match_heads method.
 
         Returns:
             None
         """
         if out_path:
             rm_mkdir(out_path)
+        locations = self.match_heads(self.heads, **fpn_kwargs)
         # replace the head image into src image at (x, y)
         pbar = tqdm(total=len(self.heads))
         ret = []
-        for i in enumerate(self.heads):
-            result = self.replace_head(i, **fpn_kwargs)
+        for i, (x, y) in enumerate(locations):
+            result = self.paste_head(self.heads[i], x, y)
             if out_path:
                 result.save(os.path.join(out_path, f"{i}.png"))
             else:
@@ -233,11 +583,17 @@ class Heading:
             return ret
 
     def replace_head(self, idx: int, **fpn_kwargs):
-        src = np.array(self.picture) / 255.0
         ref_head = self.heads[idx]
         x, y = self.static_fpn(ref_head, **fpn_kwargs)
-        mask = np.array(ref_head)[..., -1] / 255.0
-        head = np.array(ref_head) / 255.0
+        return self.paste_head(ref_head, x, y)
+
+    def paste_head(self, ref_head: Image.Image | np.ndarray, x: int, y: int):
+        """
+        Alpha blend `ref_head` into the source image with its top-left corner at row x, column y.
+        """
+        src = np.asarray(self.picture) / 255.0
+        mask = np.asarray(ref_head)[..., -1] / 255.0
+        head = np.asarray(ref_head) / 255.0
         dst = src.copy()
         dst[x : x + head.shape[0], y : y + head.shape[1], :] = alpha_blend(
             head,
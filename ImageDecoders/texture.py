@@ -5,9 +5,17 @@ import torch
 import matplotlib.pyplot as plt
 
 from tqdm import tqdm
+from typing import Literal
+import hashlib
+from ABReader.mesh import Mesh
+from ABReader.asset_cache import LRUCache
 
 V = tuple[int, int]
 
+# (dst, src) pixel index maps of the mesh layouts rendered lately,
+# see MeshTexture2D.index_map
+INDEX_MAPS = LRUCache(256 << 20)
+
 
 def show_image(image: np.ndarray):
     image = image.astype(np.uint8)
@@ -26,8 +34,8 @@ class MeshTexture2D:
         self,
         texture_file: str = None,
         mesh_file: str = None,
-        texture: Image.Image = None,
-        mesh: list[str] = None,
+        texture: Image.Image | np.ndarray = None,
+        mesh: list[str] | Mesh = None,
         face_idx_bias=1,
     ) -> None:
         self.texture_file = texture_file
@@ -40,10 +48,44 @@ class MeshTexture2D:
         self.mesh = self._read_mesh(mesh, face_idx_bias)
         m = self.mesh["mesh"]
         dims = np.max(m, axis=0)
-        self.output = np.zeros((dims[1] + 1, dims[0] + 1, self.picture.shape[-1]))
-        print(f"Output shape: {self.output.shape}")
+        self.output_shape = (dims[1] + 1, dims[0] + 1, self.picture.shape[-1])
+        # allocated by render in the texture dtype (uint8 for RGBA8),
+        # unless `out` is given
+        self.output: np.ndarray = None
+        print(f"Output shape: {self.output_shape}")
 
-    def _read_mesh(self, mesh: list[str], face_idx_bias=1):
+    def _read_mesh(self, mesh: list[str] | Mesh, face_idx_bias=1):
+        if isinstance(mesh, Mesh):
+            groups = {
+                "mesh": mesh.vertices[:, :2].astype(np.int64),
+                "texture": mesh.uv,
+                "face": mesh.indices,
+            }
+        else:
+            groups = self._parse_obj(mesh, face_idx_bias)
+        # normalize mesh coordinates to [0, ]
+        mesh = np.asarray(groups["mesh"], dtype=np.int64).reshape(-1, 2)
+        mesh = mesh - mesh.min(axis=0)
+        # convert texture coordinates to pixel coords
+        texture = np.asarray(groups["texture"], dtype=np.float64).reshape(-1, 2)
+        H, W = self.picture.shape[:2]
+        texture = np.rint(texture * (W, H)).astype(np.int64)
+        # assemble faces into rectangles, two triangles per face
+        indices = np.asarray(groups["face"], dtype=np.int64).reshape(-1, 3)
+        pairs = indices[: len(indices) // 2 * 2].reshape(-1, 6)
+        # (mesh x, mesh y, texture x, texture y) of the face points, mesh transposed
+        points = np.concatenate([mesh[:, ::-1][pairs], texture[pairs]], axis=2)
+        # (m_xmin, m_xmax, m_ymin, m_ymax, t_xmin, t_xmax, t_ymin, t_ymax) of every face
+        rects = np.stack([points.min(axis=1), points.max(axis=1)], axis=-1)
+        rects = rects.reshape(-1, 8)
+        groups["mesh"], groups["texture"], groups["rects"] = mesh, texture, rects
+        groups["face"] = [
+            {"p": (p[:3], p[3:]), "m": tuple(r[:4]), "t": tuple(r[4:])}
+            for p, r in zip(pairs, rects.tolist())
+        ]
+        return groups
+
+    def _parse_obj(self, mesh: list[str] = None, face_idx_bias=1):
         if mesh:
             lines = mesh
         else:
@@ -67,53 +109,61 @@ class MeshTexture2D:
                     groups["face"].append(
                         [int(x.split("/")[0]) - face_idx_bias for x in args[1:]]
                     )
-        # normalize mesh coordinates to [0, ]
-        mesh = groups["mesh"]
-        for i in range(len(mesh[0])):
-            min_val = min([v[i] for v in mesh])
-            for j in range(len(mesh)):
-                mesh[j][i] -= min_val
-        # transpose
-        mesh = [v[::-1] for v in mesh]
-        # convert texture coordinates to pixel coords
-        texture = groups["texture"]
-        for i in range(len(texture)):
-            texture[i] = [
-                round(texture[i][0] * self.picture.shape[1]),
-                round(texture[i][1] * self.picture.shape[0]),
-            ]
-        # assemble faces into rectrangles
-        faces = []
-        for i in list(range(len(groups["face"])))[::2]:
-            a, b = groups["face"][i], groups["face"][i + 1]
-            points = list(set(a + b))
-            mesh_points = [mesh[p] for p in points]
-            texture_points = [texture[p] for p in points]
-            faces.append(
-                {
-                    "p": (a, b),
-                    "m": (
-                        min([p[0] for p in mesh_points]),
-                        max([p[0] for p in mesh_points]),
-                        min([p[1] for p in mesh_points]),
-                        max([p[1] for p in mesh_points]),
-                    ),
-                    "t": (
-                        min([p[0] for p in texture_points]),
-                        max([p[0] for p in texture_points]),
-                        min([p[1] for p in texture_points]),
-                        max([p[1] for p in texture_points]),
-                    ),
-                }
-            )
-        groups["face"] = faces
         return groups
 
-    def _read_picture(self, texture: Image):
+    def _read_picture(self, texture: Image.Image | np.ndarray):
+        if isinstance(texture, np.ndarray):
+            # exported arrays are flipped views, flipping back is free
+            return np.flip(texture, axis=0)
         picture = texture if texture else Image.open(self.texture_file)
         return np.flip(np.array(picture), axis=0)
 
-    def render(self, processes: int = 1):
+    def render(
+        self,
+        processes: int = 1,
+        mode: Literal["gather", "faces"] = "gather",
+        out: np.ndarray = None,
+    ):
+        """
+        Paste the texture rectangles of every face into the output.
+
+        Args:
+            processes (int): Number of threads of the "faces" mode. Default is 1.
+            mode (str): "gather" copies all faces in one gather through the cached index
+            maps of the mesh layout (see `index_map`), "faces" slices face by face.
+            Default is "gather".
+            out (np.ndarray): Caller-owned C-contiguous buffer of the output shape and
+            the texture dtype to render into, e.g. a canvas reused across renders. It is
+            cleared first. Default is None, allocating a new buffer.
+
+        Returns:
+            np.ndarray: The rendered image, `out` if given.
+        """
+        if out is None:
+            out = np.zeros(self.output_shape, dtype=self.picture.dtype)
+        else:
+            if (
+                out.shape != self.output_shape
+                or out.dtype != self.picture.dtype
+                or not out.flags.c_contiguous
+            ):
+                raise ValueError(
+                    f"Output buffer must be a C-contiguous {self.picture.dtype} array "
+                    f"of shape {self.output_shape}, got {out.dtype} {out.shape}"
+                )
+            out.fill(0)
+        self.output = out
+        if mode == "gather":
+            dst, src = self.index_map()
+            texture = np.ascontiguousarray(self.picture)
+            # move whole pixels as single words when possible (RGBA8 -> uint32)
+            C = self.output.shape[-1]
+            word = np.dtype(f"V{C * texture.itemsize}")
+            if C * texture.itemsize == 4:
+                word = np.dtype(np.uint32)
+            canvas = self.output.view(word).reshape(-1)
+            canvas[dst] = texture.view(word).reshape(-1)[src]
+            return self.output
         faces = self.mesh["face"]
         if processes > 1:
             from concurrent.futures import ThreadPoolExecutor as TPE
@@ -128,9 +178,47 @@ class MeshTexture2D:
         if processes > 1:
             pool.shutdown(wait=True)
         self.pbar.close()
-        self.output = np.flip(self.output, axis=1)
+        self.output[...] = np.flip(self.output, axis=1)
         return self.output
 
+    def index_map(self):
+        """
+        Flat pixel indices (dst into the output, src into the texture) such that
+        rendering is `output[dst] = texture[src]`. They only depend on the face
+        rectangles and the texture and output shapes, so they are cached across
+        textures of the same layout.
+        """
+        rects = self.mesh["rects"]
+        key = (
+            "index_map",
+            hashlib.blake2b(rects.tobytes(), digest_size=16).hexdigest(),
+            self.picture.shape[:2],
+            self.output_shape[:2],
+        )
+        return INDEX_MAPS.get_or_load(key, lambda: self._build_index_map(rects))
+
+    def _build_index_map(self, rects: np.ndarray):
+        X, Y = self.output_shape[0] - 1, self.output_shape[1] - 1
+        H_t, W_t = self.picture.shape[:2]
+        # texture pixel of each output pixel (output already flipped along axis 1),
+        # -1 if none
+        idx = np.full((X + 1, Y + 1), -1, dtype=np.int64)
+        # later faces overwrite earlier ones, like rendering face by face
+        for m_xmin, m_xmax, m_ymin, m_ymax, t_xmin, t_xmax, t_ymin, t_ymax in rects:
+            h, w = m_xmax - m_xmin + 1, m_ymax - m_ymin + 1
+            if min(t_ymax + 1, H_t) - t_ymin < h or min(t_xmax + 1, W_t) - t_xmin < w:
+                raise ValueError(
+                    f"Texture rect {(t_xmin, t_xmax, t_ymin, t_ymax)} is smaller than "
+                    f"mesh rect {(m_xmin, m_xmax, m_ymin, m_ymax)}"
+                )
+            src = (t_ymin + np.arange(h))[:, np.newaxis] * W_t + t_xmin + np.arange(w)
+            # face rows are pasted bottom-up from X - m_xmin
+            idx[X - m_xmin - h + 1 : X - m_xmin + 1, m_ymin : m_ymin + w] = src[::-1]
+        idx = idx.reshape(-1)
+        dst = np.flatnonzero(idx >= 0)
+        index_dtype = np.int32 if max(idx.size, H_t * W_t) < 1 << 31 else np.int64
+        return dst.astype(index_dtype), idx[dst].astype(index_dtype)
+
     def _render_face(self, face):
         X, Y, _ = self.output.shape
         X, Y = X - 1, Y - 1
@@ -13,3 +13,14 @@ def rm_mkdir(dir: str):
 
 def read_img(file: str):
     return np.array(Image.open(file))
+
+
+def to_image(image: Image.Image | np.ndarray):
+    return Image.fromarray(image) if isinstance(image, np.ndarray) else image
+
+
+def image_size(image: Image.Image | np.ndarray):
+    """
+    (width, height) of a PIL image or an (H, W, C) array.
+    """
+    return (image.shape[1], image.shape[0]) if isinstance(image, np.ndarray) else image.size
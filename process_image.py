@@ -25,7 +25,7 @@ class ImagePipeline:
         self.render_output = out_file
         mt2d = MeshTexture2D(texture_file, mesh_file, 0)
         output = mt2d.render(processes)
-        Image.fromarray(output.astype(np.uint8)).save(self.render_output)
+        Image.fromarray(output).save(self.render_output)
         print(f"Rendering done written to {out_file}.")
         return self
 
@@ -4,16 +4,27 @@ from flask_cors import CORS
 import re
 import os
 import base64
+import hashlib
 
 import numpy as np
 from ABReader.ab_input import ABInput
 from ABReader.ab_exporter import ABExporter
+from ABReader.asset_cache import AssetCache, LRUCache
+from ABReader.mesh import Mesh
 from ImageDecoders.texture import MeshTexture2D
 from ImageDecoders.head import Heading
 from PIL import Image
 
 app = Flask(__name__)
 CORS(app)
+# decoded paintings and faces on disk, the directory is created on the first write
+ASSET_CACHE = AssetCache(
+    os.environ.get("ASSET_CACHE_DIR", os.path.join(".cache", "assets"))
+)
+# parsed bundles and decoded images shared across requests
+MEMORY_CACHE = LRUCache(1 << 30)
+# head placements by (painting, face bundle), every expression of a bundle shares its anchor
+PLACEMENTS = LRUCache(1 << 20)
 
 ASSET_PROPS = {
     "n": "no global background",
@@ -163,30 +174,71 @@ def get_char_layers():
     return ret
 
 
-def load_asset_from_raw(asset_dir: str):
+def load_bundle(bundle_dir: str) -> ABInput:
+    def load():
+        ab_input = ABInput(bundle_dir, lazy=True)
+        ab_input.read_assets()
+        return ab_input
+
+    return MEMORY_CACHE.get_or_load(LRUCache.file_key("bundle", bundle_dir), load)
+
+
+def load_asset_from_raw(asset_dir: str) -> Image.Image:
+    return MEMORY_CACHE.get_or_load(
+        LRUCache.file_key("painting", asset_dir), lambda: decode_asset(asset_dir)
+    )
+
+
+def decode_asset(asset_dir: str):
+    cached = ASSET_CACHE.get(asset_dir, "painting")
+    if cached:
+        return Image.fromarray(cached[0])
     # load asset
-    ab_input = ABInput(asset_dir)
-    ab_input.read_assets()
+    ab_input = load_bundle(asset_dir)
     exporter = ABExporter(ab_input)
-    results = exporter.export(processes=2)
-    img: Image.Image = None
-    lines: list[str] = None
+    results = exporter.export(processes=2, as_array=True)
+    img: np.ndarray = None
+    mesh: Mesh = None
     # print(results)
     for result in results:
         # print(type(result))
-        if type(result) is Image.Image:
+        if isinstance(result, np.ndarray):
             img = result
         else:
-            lines = result
+            mesh = result
     # decode texture
-    if lines:
-        mt2d = MeshTexture2D(texture=img, mesh=lines, face_idx_bias=0)
-        output = Image.fromarray(mt2d.render(4).astype(np.uint8))
+    if mesh:
+        output = render_painting(img, mesh)
     else:
-        output = img
+        output = Image.fromarray(img)
+    ASSET_CACHE.put(asset_dir, "painting", [np.array(output)])
     return output
 
 
+def render_painting(img: np.ndarray, mesh: Mesh) -> Image.Image:
+    mt2d = MeshTexture2D(texture=img, mesh=mesh)
+    # the PIL image maps the rendered buffer without copying and is cached as the painting,
+    # so every render gets a buffer of its own
+    return Image.fromarray(mt2d.render())
+
+
+def load_faces_from_raw(face_dir: str) -> list[np.ndarray]:
+    return MEMORY_CACHE.get_or_load(
+        LRUCache.file_key("faces", face_dir), lambda: decode_faces(face_dir)
+    )
+
+
+def decode_faces(face_dir: str):
+    cached = ASSET_CACHE.get(face_dir, "faces")
+    if cached:
+        return cached
+    ab_input = load_bundle(face_dir)
+    ab_exporter = ABExporter(ab_input)
+    faces: list[np.ndarray] = ab_exporter.export(processes=4, as_array=True)
+    ASSET_CACHE.put(face_dir, "faces", faces)
+    return faces
+
+
 @app.route("/loadAsset", methods=["POST"])
 def load_asset():
     asset_name = request.json["asset"]
@@ -201,7 +253,13 @@ def load_asset():
     )
 
 
-def image_to_b64(image: Image.Image):
+def content_key(kind: str, data: bytes):
+    return (kind, hashlib.blake2b(data, digest_size=16).hexdigest())
+
+
+def image_to_b64(image: Image.Image | np.ndarray):
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
     buf = io.BytesIO()
     image.save(buf, format="PNG")
     return base64.b64encode(buf.getvalue()).decode()
@@ -212,30 +270,40 @@ def apply_face():
     char = request.json["char"] if "char" in request.json else None
     face = request.json["face"]
     img = request.json["img"] if "img" in request.json else None
+    # expression to apply, index into the faces of the bundle
+    idx = request.json["index"] if "index" in request.json else 0
+    if not isinstance(idx, int) or isinstance(idx, bool):
+        return {"error": f"index must be an integer, got {idx!r}"}, 400
     if img:
         img = base64.b64decode(img)
+        painting_key = content_key("painting", img)
         img = io.BytesIO(img)
         img = Image.open(img)
     else:
         # img is not read into buffer, read from raw file
-        img = load_asset_from_raw(os.path.join("AssetBundles", "painting", char))
+        painting_dir = os.path.join("AssetBundles", "painting", char)
+        img = load_asset_from_raw(painting_dir)
+        painting_key = LRUCache.file_key("painting", painting_dir)
     export_faces = True
     try:
         # decode face files first
         face_dir = os.path.join("AssetBundles", "paintingface", face)
-        ab_input = ABInput(face_dir)
-        ab_input.read_assets()
-        ab_exporter = ABExporter(ab_input)
-        faces: list[Image.Image] = ab_exporter.export(processes=4)
+        faces = load_faces_from_raw(face_dir)
+        faces_key = LRUCache.file_key("faces", face_dir)
     except:
         # face is b64encoded string
         face = base64.b64decode(face)
+        faces_key = content_key("face", face)
         face = io.BytesIO(face)
         face = Image.open(face)
         faces = [face]
         export_faces = False
-    heading = Heading(src=img, heads=[faces[0]])
-    result = heading.replace_head(0)
+    if not 0 <= idx < len(faces):
+        return {"error": f"index {idx} out of range for {len(faces)} faces"}, 400
+    heading = Heading(src=img, heads=faces)
+    # the search runs once per painting and bundle, applying an expression is then a blend
+    placements = PLACEMENTS.get_or_load((painting_key, faces_key), heading.place_heads)
+    result = heading.paste_head(faces[idx], *placements[idx])
     result = image_to_b64(result)
     ret = {
         "image": result,
@@ -244,5 +312,10 @@ def apply_face():
     return ret
 
 
+@app.route("/cacheStats", methods=["GET"])
+def cache_stats():
+    return MEMORY_CACHE.stats()
+
+
 if __name__ == "__main__":
     app.run(port=5500)